@@ -1,6 +1,7 @@
 import math
-from sqlalchemy import func
-from src.db import get_session, RentListing, SellListing
+from src.db import get_session, ListingAggregate, RentListing, SellListing
+from src.db.fulltext import fts_match, phrase_prefix, text_search
+from src.db.queries import district_aggregates_query, price_summary_query
 from collections import defaultdict
 
 
@@ -11,11 +12,11 @@ class DBSearch:
         session = get_session()
         try:
             q = session.query(RentListing)
-            q = q.filter(RentListing.price > 2000)        
-            if district:
-                q = q.filter(RentListing.district.ilike(f"%{district}%"))
-            if disposition:
-                q = q.filter(RentListing.disposition.ilike(f"%{disposition}%"))
+            q = q.filter(RentListing.price > 2000)
+            q = q.filter(RentListing.canonical_id == RentListing.external_id)
+            match = fts_match(phrase_prefix(district), phrase_prefix(disposition))
+            if match:
+                q = text_search(q, RentListing, match)
             if max_price:
                 q = q.filter(RentListing.price <= max_price)
             results = q.order_by(RentListing.price.asc()).limit(limit).all()
@@ -28,13 +29,13 @@ class DBSearch:
         session = get_session()
         try:
             q = session.query(SellListing)
-            q = q.filter(SellListing.price > 50000)        
-            if district:
-                q = q.filter(SellListing.district.ilike(f"%{district}%"))
+            q = q.filter(SellListing.price > 50000)
+            q = q.filter(SellListing.canonical_id == SellListing.external_id)
+            match = fts_match(phrase_prefix(district), phrase_prefix(disposition))
+            if match:
+                q = text_search(q, SellListing, match)
             if max_price:
                 q = q.filter(SellListing.price <= max_price)
-            if disposition:
-                q = q.filter(SellListing.disposition.ilike(f"%{disposition}%"))
             result = q.order_by(SellListing.price.asc()).limit(limit).all()
             return [self._s(item) for item in result]       
         finally:
@@ -57,9 +58,7 @@ class DBSearch:
         }
 
     def _s(self, l: SellListing) -> dict:
-        payback_years = None
-        if l.price and l.predicted_rent_price:
-            payback_years = round(l.price / (l.predicted_rent_price * 12), 1)
+        payback_years = round(l.years_to_payback, 1) if l.years_to_payback is not None else None
         return {
             "type": "sell",
             "disposition": l.disposition or "N/A",
@@ -79,32 +78,21 @@ class DBSearch:
     def get_market_stats(self) -> dict:
         session = get_session()
         try:
-            r = session.query(
-                func.avg(RentListing.price).label("avg_rent_price"),
-                func.min(RentListing.price).label("min_rent"),
-                func.max(RentListing.price).label("max_rent"),
-                func.count(RentListing.price).label("count_rent")
-            ).filter(RentListing.price > 2000).first()
-
-            s = session.query(
-                func.avg(SellListing.price).label("avg_sell_price"),
-                func.min(SellListing.price).label("min_sell"),
-                func.max(SellListing.price).label("max_sell"),
-                func.count(SellListing.price).label("count_sell")
-            ).filter(SellListing.price > 500000).first()
+            r = session.execute(price_summary_query("rent")).first()
+            s = session.execute(price_summary_query("sale")).first()
 
             return {
                 "rent": {
-                    "avg": int(r.avg_rent_price or 0),
-                    "min": int(r.min_rent or 0),
-                    "max": int(r.max_rent or 0),
-                    "count": r.count_rent
+                    "avg": int(r.avg or 0),
+                    "min": int(r.min or 0),
+                    "max": int(r.max or 0),
+                    "count": r.count or 0
                 },
                 "sell": {
-                    "avg": int(s.avg_sell_price or 0),
-                    "min": int(s.min_sell or 0),
-                    "max": int(s.max_sell or 0),
-                    "count": s.count_sell
+                    "avg": int(s.avg or 0),
+                    "min": int(s.min or 0),
+                    "max": int(s.max or 0),
+                    "count": s.count or 0
                 }
             }
         finally:
@@ -113,18 +101,12 @@ class DBSearch:
     def get_student_districts(self) -> str:
         session = get_session()
         try:
-            result = session.query(
-                RentListing.district,
-                func.avg(RentListing.price).label("avg_price"),
-                func.count(RentListing.id).label("count")
-            ).filter(
-                RentListing.price > 2000,
-                RentListing.price < 15000          
-            ).group_by(
-                RentListing.district
-            ).order_by(
-                func.avg(RentListing.price).asc()
-            ).limit(5).all()
+            query = district_aggregates_query(
+                "rent", ListingAggregate.budget_count, ListingAggregate.budget_price_sum
+            )
+            result = session.execute(
+                query.order_by(query.selected_columns.avg_price.asc()).limit(5)
+            ).all()
 
             lines = ["TOP DISTRICTS FOR STUDENTS (cheapest avg rent):"]
             for i, r in enumerate(result, 1):
@@ -136,19 +118,13 @@ class DBSearch:
     def get_family_districts(self) -> str:
         session = get_session()
         try:
-            result = session.query(
-                RentListing.district,
-                func.avg(RentListing.price).label("avg_price"),
-                func.count(RentListing.id).label("count")
-            ).filter(
-                RentListing.price > 2000,
-                RentListing.disposition.in_(["3+kk", "3+1", "4+kk", "4+1"]),
-                RentListing.balcony == True
-            ).group_by(
-                RentListing.district
-            ).order_by(
-                func.count(RentListing.id).desc()
-            ).limit(5).all()
+            query = district_aggregates_query(
+                "rent", ListingAggregate.balcony_count, ListingAggregate.balcony_price_sum,
+                dispositions=["3+kk", "3+1", "4+kk", "4+1"],
+            )
+            result = session.execute(
+                query.order_by(query.selected_columns.count.desc()).limit(5)
+            ).all()
 
             lines = ["TOP DISTRICTS FOR FAMILIES (3+ rooms with balcony):"]
             for i, r in enumerate(result, 1):
@@ -160,17 +136,12 @@ class DBSearch:
     def get_investment_districts(self) -> str:
         session = get_session()
         try:
-            result = session.query(
-                SellListing.district,
-                func.avg(SellListing.price).label("avg_price"),        
-                func.count(SellListing.id).label("count")
-            ).filter(
-                SellListing.price > 500000
-            ).group_by(
-                SellListing.district
-            ).order_by(
-                func.avg(SellListing.price).asc()
-            ).limit(8).all()
+            query = district_aggregates_query(
+                "sale", ListingAggregate.listing_count, ListingAggregate.price_sum
+            )
+            result = session.execute(
+                query.order_by(query.selected_columns.avg_price.asc()).limit(8)
+            ).all()
 
             lines = ["TOP INVESTMENT DISTRICTS (lowest avg price):"]
             for i, r in enumerate(result, 1):
@@ -182,17 +153,12 @@ class DBSearch:
     def get_districts_stats(self) -> str:
         session = get_session()
         try:
-            result = session.query(
-                RentListing.district,
-                func.avg(RentListing.price).label("avg_price"),
-                func.count(RentListing.id).label("count")
-            ).filter(
-                RentListing.price > 2000
-            ).group_by(
-                RentListing.district
-            ).order_by(
-                func.avg(RentListing.price).asc()
-            ).limit(10).all()
+            query = district_aggregates_query(
+                "rent", ListingAggregate.listing_count, ListingAggregate.price_sum
+            )
+            result = session.execute(
+                query.order_by(query.selected_columns.avg_price.asc()).limit(10)
+            ).all()
 
             lines = ["DISTRICT OVERVIEW (avg rent):"]
             for r in result:
@@ -205,15 +171,7 @@ class DBSearch:
         session = get_session()
         try:
             def get_stats(district):
-                return session.query(
-                    func.avg(RentListing.price).label("avg"),
-                    func.min(RentListing.price).label("min"),
-                    func.max(RentListing.price).label("max"),
-                    func.count(RentListing.id).label("count")
-                ).filter(
-                    RentListing.price > 2000,
-                    RentListing.district.ilike(f"%{district}%")
-                ).first()
+                return session.execute(price_summary_query("rent", district=district)).first()
 
             r1 = get_stats(d1)
             r2 = get_stats(d2)
@@ -224,13 +182,13 @@ class DBSearch:
   avg: {int(r1.avg or 0):,} CZK
   min: {int(r1.min or 0):,} CZK
   max: {int(r1.max or 0):,} CZK
-  listings: {r1.count}
+  listings: {r1.count or 0}
 
 {d2}:
   avg: {int(r2.avg or 0):,} CZK
   min: {int(r2.min or 0):,} CZK
   max: {int(r2.max or 0):,} CZK
-  listings: {r2.count}"""
+  listings: {r2.count or 0}"""
         finally:
             session.close()
 
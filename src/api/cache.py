@@ -0,0 +1,114 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.db.data_version import read_data_version
+
+CACHED_PREFIXES = ("/api/analytics/", "/api/marketplace/")
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+# Browsers reuse a response this long, then revalidate it with If-None-Match
+CACHE_MAX_AGE = 60
+# How long a read of data_version is trusted before asking the database again
+VERSION_TTL = 5.0
+
+
+class ResponseCache:
+    """LRU of response bodies bounded by their total size in bytes."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, body, media_type, etag):
+        # one response larger than a quarter of the budget would evict everything else
+        if len(body) > self.max_bytes // 4:
+            return
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[0])
+        self.entries[key] = (body, media_type, etag)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (old_body, _, _) = self.entries.popitem(last=False)
+            self.size -= len(old_body)
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+
+def make_etag(version, body) -> str:
+    return f'"{version}-{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag) -> bool:
+    """If-None-Match uses weak comparison: a W/ prefix (added by compressing
+    proxies) is ignored, and the header may list several tags."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """Serve repeated GETs of the data endpoints from memory.
+
+    Entries are keyed on path, query string and the data version, so a
+    monthly update (which bumps data_version) invalidates all of them.
+    Every cached response carries a strong ETag and If-None-Match gets a 304.
+    """
+
+    def __init__(self, app, cache=None):
+        super().__init__(app)
+        self.cache = cache or ResponseCache()
+        self.version = None
+        self.version_read_at = 0.0
+
+    async def data_version(self):
+        now = time.monotonic()
+        if self.version is None or now - self.version_read_at > VERSION_TTL:
+            version = await read_data_version()
+            if version != self.version:
+                self.cache.clear()
+                self.version = version
+            self.version_read_at = now
+        return self.version
+
+    def cached_response(self, request, body, media_type, etag):
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method != "GET" or not request.url.path.startswith(CACHED_PREFIXES):
+            return await call_next(request)
+
+        version = await self.data_version()
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return self.cached_response(request, *entry)
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        media_type = response.headers.get("content-type")
+        etag = make_etag(version, body)
+        self.cache.put(key, body, media_type, etag)
+        return self.cached_response(request, body, media_type, etag)
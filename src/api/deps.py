@@ -0,0 +1,10 @@
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db import get_async_session
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_session() as db:
+        yield db
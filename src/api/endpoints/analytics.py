@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from src.db import get_session, RentListing, SellListing
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.api.deps import get_db
+from src.db import RentListing, SellListing
+from src.db.queries import disposition_aggregates_query, payback_query, prices_query
 import numpy as np
 
 #Count of Adverts by Disposition only for rent listings done
@@ -10,38 +11,26 @@ import numpy as np
 #Payback period distribution for sell listings (price / predicted rent price)
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
-def get_db():
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/count_by_disposition")
-def count_by_disposition(db: Session = Depends(get_db)):
-    results = db.query(
-        RentListing.disposition,
-        func.count(RentListing.id).label("count")
-    ).group_by(RentListing.disposition).order_by(func.count(RentListing.id).desc()).all()
+async def count_by_disposition(db: AsyncSession = Depends(get_db)):
+    query = disposition_aggregates_query("rent")
+    results = (await db.execute(query.order_by(query.selected_columns.count.desc()))).all()
     return {
         "labels":[row.disposition for row in results if row.disposition],
         "values":[row.count for row in results if row.disposition]
     }
 
 @router.get("/average_price")
-def average_price(db: Session = Depends(get_db)):
-    results = db.query(
-        RentListing.disposition,
-        func.avg(RentListing.price).label("average_price")
-    ).group_by(RentListing.disposition).all()
+async def average_price(db: AsyncSession = Depends(get_db)):
+    results = (await db.execute(disposition_aggregates_query("rent"))).all()
     return{
         "labels":[row.disposition for row in results if row.disposition],
         "values":[round(row.average_price,2) for row in results if row.disposition]
     }
 
 @router.get("/price_distribution_rent")
-def price_distribution(db: Session = Depends(get_db)):
-    results = db.query(RentListing.price).all()
+async def price_distribution(db: AsyncSession = Depends(get_db)):
+    results = (await db.execute(prices_query(RentListing))).all()
     prices = [row.price for row in results if row.price]
     
     if not prices:
@@ -89,8 +78,8 @@ def price_distribution(db: Session = Depends(get_db)):
     }
 
 @router.get("/price_distribution_sell")
-def price_distribution_sell(db: Session = Depends(get_db)):
-    results = db.query(SellListing.price).all()
+async def price_distribution_sell(db: AsyncSession = Depends(get_db)):
+    results = (await db.execute(prices_query(SellListing))).all()
     prices = [row.price for row in results if row.price]
     
     if not prices:
@@ -150,8 +139,8 @@ def price_distribution_sell(db: Session = Depends(get_db)):
     }
 
 @router.get("/payback_period_distribution")
-def payback_period_distribution(db: Session = Depends(get_db)):
-    results = db.query(SellListing.price , SellListing.predicted_rent_price).all()
+async def payback_period_distribution(db: AsyncSession = Depends(get_db)):
+    results = (await db.execute(payback_query())).all()
     payback_periods = []
     for price, rent_price in results:
         if price and rent_price and rent_price > 0:
@@ -1,113 +1,97 @@
-import json
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from src.db import get_session, SellListing
-from src.schemas.listing import SellListingRead
-from fastapi import HTTPException
+from src.api.deps import get_db
+from src.api.pagination import decode_cursor, encode_cursor
+from src.api.responses import json_fragment, json_response
+from src.db.queries import (
+    listing_by_id_query,
+    marketplace_bbox_query,
+    marketplace_districts_query,
+    marketplace_listings_query,
+    marketplace_sort_key,
+)
+from src.schemas.listing import SellListingPage, SellListingRead
 
 
 router = APIRouter(prefix="/api/marketplace", tags=["Marketplace"])
 
 
-def get_db():
-    db = get_session()
-    try:
-        yield db
-    finally:
-        db.close()
+def _listing_dict(row):
+    """Marketplace card from a MARKETPLACE_COLUMNS row.
+
+    all_images is stored as a JSON list and embedded as is, without parsing.
+    """
+    listing_dict = row._asdict()
+    listing_dict["all_images"] = json_fragment(row.all_images)
+    # Years to Payback (ROI), stored next to predicted_rent_price
+    if row.years_to_payback is not None:
+        listing_dict["years_to_payback"] = round(row.years_to_payback, 1)
+    return listing_dict
 
 
-@router.get("/", response_model=List[SellListingRead])
-def get_marketplace_listings(
+@router.get("/", response_model=SellListingPage)
+async def get_marketplace_listings(
     district: Optional[str] = Query(None, description="Filter by district"),
     min_price: Optional[int] = Query(None, ge=0, description="Minimum price"),
     max_price: Optional[int] = Query(None, ge=0, description="Maximum price"),
     disposition: Optional[str] = Query(None, description="Disposition filter (e.g., 2+kk)"),
+    max_payback: Optional[float] = Query(None, gt=0, description="Maximum years to payback"),
+    sort: Literal["price", "payback"] = Query("price", description="price (cheapest first) or payback (fastest first)"),
+    q: Optional[str] = Query(None, max_length=200, description="Keywords: district, metro, balkon, garaz..."),
     
-    skip: int = Query(0, ge=0, description="Skip N records"),
-    limit: int = Query(20, le=100, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of records to return"),
     
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(SellListing)
-    query = query.filter(SellListing.price >= 500000)
-    if district:
-        query = query.filter(SellListing.district == district)
-    
-    if min_price:
-        query = query.filter(SellListing.price >= min_price)
-    
-    if max_price:
-        query = query.filter(SellListing.price <= max_price)
-    
-    if disposition:
-        query = query.filter(SellListing.disposition == disposition)
-    
-    # Only apartments with predicted rent price
-    query = query.filter(SellListing.predicted_rent_price.isnot(None))
-    
-    # Sort by price (cheapest first)
-    query = query.order_by(SellListing.price.asc())
-    
-    # Pagination
-    listings = query.offset(skip).limit(limit).all()
+    after = decode_cursor(cursor, sort) if cursor else None
+    query = marketplace_listings_query(
+        district=district, min_price=min_price, max_price=max_price, disposition=disposition,
+        max_payback=max_payback, sort=sort, q=q, after=after,
+    )
     
-    # Convert to dict and calculate ROI
-    result = []
-    for listing in listings:
-        listing_dict = {
-            "id": listing.id,
-            "price": listing.price,
-            "disposition": listing.disposition,
-            "surface": listing.surface,
-            "district": listing.district,
-            "furnishing": listing.furnishing,
-            "latitude": listing.latitude,
-            "longitude": listing.longitude,
-            "distance_to_center": listing.distance_to_center,
-            "distance_to_metro_km": listing.distance_to_metro_km,
-            "nearest_metro": listing.nearest_metro,
-            "main_image": listing.main_image,
-            "predicted_rent_price": listing.predicted_rent_price,
-        }
-        
-        # Parse all_images from JSON string to list
-        if listing.all_images:
-            try:
-                listing_dict["all_images"] = json.loads(listing.all_images)
-            except Exception as e:
-                print(f"Error parsing all_images for listing {listing.id}: {e}")
-                listing_dict["all_images"] = []
-        else:
-            listing_dict["all_images"] = []
-        
-        # Calculate Years to Payback (ROI)
-        if listing.predicted_rent_price and listing.predicted_rent_price > 0:
-            annual_rent = listing.predicted_rent_price * 12
-            years_to_payback = listing.price / annual_rent
-            listing_dict["years_to_payback"] = round(years_to_payback, 1)
-        else:
-            listing_dict["years_to_payback"] = None
-        
-        result.append(listing_dict)
+    # Keyset pagination: one extra row tells whether there is a next page
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, marketplace_sort_key(rows[-1], sort))
     
-    return result
+    return json_response({"items": [_listing_dict(row) for row in rows], "next_cursor": next_cursor})
+
+@router.get("/bbox", response_model=List[SellListingRead])
+async def get_listings_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90, description="South edge"),
+    min_lon: float = Query(..., ge=-180, le=180, description="West edge"),
+    max_lat: float = Query(..., ge=-90, le=90, description="North edge"),
+    max_lon: float = Query(..., ge=-180, le=180, description="East edge"),
+    district: Optional[str] = Query(None, description="Filter by district"),
+    min_price: Optional[int] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[int] = Query(None, ge=0, description="Maximum price"),
+    disposition: Optional[str] = Query(None, description="Disposition filter (e.g., 2+kk)"),
+    limit: int = Query(200, ge=1, le=500, description="Maximum number of records to return"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Listings inside the map viewport, cheapest first"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=400, detail="min_lat/min_lon must not exceed max_lat/max_lon")
+    query = marketplace_bbox_query(
+        min_lat, min_lon, max_lat, max_lon,
+        district=district, min_price=min_price, max_price=max_price, disposition=disposition,
+    )
+    rows = (await db.execute(query.limit(limit))).all()
+    return json_response([_listing_dict(row) for row in rows])
 
 @router.get("/districts")
-def get_unique_districts(db: Session = Depends(get_db)):
+async def get_unique_districts(db: AsyncSession = Depends(get_db)):
     """
     Get all unique districts from database
     Returns sorted list of districts
     """
     # Query unique districts (только непустые)
-    districts = db.query(SellListing.district)\
-        .filter(SellListing.district.isnot(None))\
-        .filter(SellListing.district != "")\
-        .distinct()\
-        .order_by(SellListing.district.asc())\
-        .all()
+    districts = (await db.execute(marketplace_districts_query())).all()
     
     # Преобразуем из [(district,), (district,)] в [district, district]
     district_list = [row[0] for row in districts if row[0]]
@@ -118,7 +102,7 @@ def get_unique_districts(db: Session = Depends(get_db)):
     }
 
 @router.get("/dispositions")
-def get_unique_dispositions(db: Session = Depends(get_db)):
+async def get_unique_dispositions(db: AsyncSession = Depends(get_db)):
     dispositions = [
         "1+kk",
         "1+1",
@@ -139,27 +123,8 @@ def get_unique_dispositions(db: Session = Depends(get_db)):
     }
 
 @router.get("/{listing_id}")
-def get_listing_details(listing_id: int, db: Session = Depends(get_db)):
-    listing = db.query(SellListing).filter(SellListing.id == listing_id).first()
-    if not listing:
+async def get_listing_details(listing_id: int, db: AsyncSession = Depends(get_db)):
+    row = (await db.execute(listing_by_id_query(listing_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Listing not found")
-    
-    listing_dict = {
-        "id": listing.id,
-        "price": listing.price,
-        "disposition": listing.disposition,
-        "surface": listing.surface,
-        "district": listing.district,
-        "furnishing": listing.furnishing,
-        "latitude": listing.latitude,
-        "longitude": listing.longitude,
-        "distance_to_center": listing.distance_to_center,
-        "distance_to_metro_km": listing.distance_to_metro_km,
-        "nearest_metro": listing.nearest_metro,
-        "main_image": listing.main_image,
-        "predicted_rent_price": listing.predicted_rent_price,
-        "all_images": json.loads(listing.all_images) if listing.all_images else [],
-        "years_to_payback": round(listing.price / (listing.predicted_rent_price * 12), 1)
-            if listing.predicted_rent_price and listing.predicted_rent_price > 0 else None
-    }
-    return listing_dict
+    return json_response(_listing_dict(row))
@@ -0,0 +1,31 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+from src.db.queries import MARKETPLACE_SORT_KEYS
+
+
+def encode_cursor(sort, key) -> str:
+    """Opaque page cursor: the sort key of the last listing on the page."""
+    payload = json.dumps({"sort": sort, "after": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    """Sort key stored in `cursor`; 400 when it is malformed, does not fit the
+    key of `sort` or was issued for another sort."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        after = payload["after"]
+        valid = (
+            payload["sort"] == sort
+            and isinstance(after, list)
+            and len(after) == len(MARKETPLACE_SORT_KEYS[sort])
+            and all(value is None or isinstance(value, (int, float, str)) for value in after)
+        )
+    except (ValueError, TypeError, KeyError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
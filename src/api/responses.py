@@ -0,0 +1,16 @@
+import orjson
+from fastapi import Response
+
+
+def json_response(payload, status_code=200) -> Response:
+    """Serialize `payload` straight to bytes with orjson.
+
+    Returned Responses skip FastAPI's response_model validation, so the
+    payload must already have the documented shape.
+    """
+    return Response(content=orjson.dumps(payload), status_code=status_code, media_type="application/json")
+
+
+def json_fragment(text, default="[]"):
+    """Embed JSON stored as text (e.g. all_images) without parsing it."""
+    return orjson.Fragment(text if text and text.startswith("[") else default)
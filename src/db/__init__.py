@@ -1,11 +1,17 @@
-from src.db.models import Base, RentListing, SellListing
-from src.db.database import init_db, get_session, engine
+from src.db.models import Base, RentListing, SellListing, ListingPriceHistory, ListingAggregate, QuarantinedListing, DataVersion
+from src.db.database import init_db, get_session, get_async_session, engine, async_engine
 
 __all__ = [
     "Base",
     "RentListing",
     "SellListing", 
+    "ListingPriceHistory",
+    "ListingAggregate",
+    "QuarantinedListing",
+    "DataVersion",
     "init_db",
     "get_session",
+    "get_async_session",
     "engine",
+    "async_engine",
 ]
\ No newline at end of file
@@ -0,0 +1,118 @@
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import delete, func, select
+
+from src.db.database import get_session
+from src.db.models import ListingAggregate, RentListing, SellListing
+from src.db.queries import canonical
+
+# Listings at or below the floor are placeholders ("price on request", 1 CZK...)
+PRICE_FLOORS = {"rent": 2000, "sale": 500000}
+# Upper bound of the budget measures (student rents, starter flats)
+BUDGET_PRICES = {"rent": 15000, "sale": 5000000}
+BATCH_SIZE = 500
+
+
+def _model(listing_type):
+    return RentListing if listing_type == "rent" else SellListing
+
+
+def _read_listings(session, listing_type, districts=None) -> pd.DataFrame:
+    Model = _model(listing_type)
+    district = func.coalesce(Model.district, "")
+    query = select(
+        district.label("district"),
+        func.coalesce(Model.disposition, "").label("disposition"),
+        Model.price,
+        Model.balcony,
+    ).where(canonical(Model), Model.price > PRICE_FLOORS[listing_type])
+
+    if districts is None:
+        rows = session.execute(query).all()
+    else:
+        districts = list(districts)
+        rows = []
+        for start in range(0, len(districts), BATCH_SIZE):
+            rows.extend(session.execute(query.where(district.in_(districts[start:start + BATCH_SIZE]))).all())
+    return pd.DataFrame(rows, columns=["district", "disposition", "price", "balcony"])
+
+
+def compute_aggregates(listings: pd.DataFrame, listing_type: str) -> pd.DataFrame:
+    if listings.empty:
+        return pd.DataFrame()
+    price = listings["price"]
+    balcony = listings["balcony"].fillna(False).astype(bool)
+    budget = price < BUDGET_PRICES[listing_type]
+    listings = listings.assign(
+        has_balcony=balcony.astype(int),
+        balcony_price=price.where(balcony, 0),
+        is_budget=budget.astype(int),
+        budget_price=price.where(budget, 0),
+    )
+    grouped = listings.groupby(["district", "disposition"])
+    aggregates = grouped.agg(
+        listing_count=("price", "size"),
+        price_sum=("price", "sum"),
+        price_min=("price", "min"),
+        price_max=("price", "max"),
+        balcony_count=("has_balcony", "sum"),
+        balcony_price_sum=("balcony_price", "sum"),
+        budget_count=("is_budget", "sum"),
+        budget_price_sum=("budget_price", "sum"),
+    )
+    quartiles = grouped["price"].quantile([0.25, 0.5, 0.75]).unstack()
+    aggregates["price_p25"] = quartiles[0.25]
+    aggregates["price_p50"] = quartiles[0.5]
+    aggregates["price_p75"] = quartiles[0.75]
+    return aggregates.reset_index().assign(listing_type=listing_type)
+
+
+def write_aggregates(session, listing_type, districts=None) -> int:
+    """Recompute listing_aggregates rows of `districts` (all when None) in `session`;
+    the caller commits. Returns the number of groups written."""
+    listings = _read_listings(session, listing_type, districts)
+    aggregates = compute_aggregates(listings, listing_type)
+
+    table = ListingAggregate.__table__
+    stale = delete(table).where(table.c.listing_type == listing_type)
+    if districts is None:
+        session.execute(stale)
+    else:
+        districts = list(districts)
+        for start in range(0, len(districts), BATCH_SIZE):
+            session.execute(stale.where(table.c.district.in_(districts[start:start + BATCH_SIZE])))
+    if not aggregates.empty:
+        records = aggregates.assign(refreshed_at=datetime.now()).to_dict("records")
+        session.execute(table.insert(), [{k: _plain(v) for k, v in r.items()} for r in records])
+    return len(aggregates)
+
+
+def refresh_aggregates(listing_type, districts=None):
+    """Recompute listing_aggregates for `districts` of one listing type, or the
+    whole type when None. Rows of those districts are replaced in one transaction."""
+    districts = None if districts is None else list(districts)
+    session = get_session()
+    try:
+        groups = write_aggregates(session, listing_type, districts)
+        session.commit()
+    finally:
+        session.close()
+    scope = "all districts" if districts is None else f"{len(districts)} districts"
+    print(f"   📊 {listing_type} aggregates refreshed for {scope}: {groups} groups")
+    return groups
+
+
+def has_aggregates(listing_type):
+    session = get_session()
+    try:
+        return session.execute(
+            select(ListingAggregate.listing_type).where(ListingAggregate.listing_type == listing_type).limit(1)
+        ).first() is not None
+    finally:
+        session.close()
+
+
+def _plain(value):
+    # numpy scalars -> Python for the DBAPI
+    return value.item() if hasattr(value, "item") else value
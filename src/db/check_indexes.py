@@ -0,0 +1,77 @@
+"""EXPLAIN QUERY PLAN every endpoint query and fail when one scans a table.
+
+    python -m src.db.check_indexes
+"""
+import sys
+
+from src.db import RentListing, SellListing, engine, init_db
+from src.db.queries import (
+    disposition_aggregates_query,
+    listing_by_id_query,
+    marketplace_bbox_query,
+    marketplace_districts_query,
+    marketplace_listings_query,
+    payback_query,
+    prices_query,
+)
+
+ENDPOINT_QUERIES = {
+    "marketplace": marketplace_listings_query().limit(20),
+    "marketplace?district": marketplace_listings_query(district="Žižkov").limit(20),
+    "marketplace?district&disposition&price": marketplace_listings_query(
+        district="Žižkov", disposition="2+kk", min_price=3_000_000, max_price=8_000_000
+    ).limit(20),
+    "marketplace?price": marketplace_listings_query(max_price=8_000_000).limit(20),
+    "marketplace?sort=payback": marketplace_listings_query(sort="payback").limit(20),
+    "marketplace?cursor": marketplace_listings_query(after=[5_000_000, 1000]).limit(21),
+    "marketplace?sort=payback&cursor": marketplace_listings_query(sort="payback", after=[20.0, 5_000_000, 1000]).limit(21),
+    "marketplace?sort=payback&max_payback": marketplace_listings_query(sort="payback", max_payback=25).limit(20),
+    "marketplace?q": marketplace_listings_query(q="vinohrady balkon").limit(20),
+    "marketplace/bbox": marketplace_bbox_query(50.07, 14.42, 50.09, 14.46).limit(500),
+    "marketplace/districts": marketplace_districts_query(),
+    "marketplace/{id}": listing_by_id_query(1),
+    "analytics/count_by_disposition,average_price": disposition_aggregates_query("rent"),
+    "analytics/price_distribution_rent": prices_query(RentListing),
+    "analytics/price_distribution_sell": prices_query(SellListing),
+    "analytics/payback_period_distribution": payback_query(),
+}
+
+
+def query_plan(conn, query):
+    compiled = query.compile(dialect=engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)]
+
+
+# summary tables small enough that reading them whole is the right plan
+SMALL_TABLES = {"listing_aggregates"}
+
+
+def is_full_scan(detail):
+    # "SCAN sell_listings" reads every row; "SCAN ... USING INDEX" walks an index
+    if not detail.startswith("SCAN ") or "INDEX" in detail or "CONSTANT ROW" in detail:
+        return False
+    return detail.split()[1] not in SMALL_TABLES
+
+
+def check_indexes():
+    init_db()
+    # fresh connections, so statistics from a migration's ANALYZE are loaded
+    engine.dispose()
+    failed = []
+    with engine.connect() as conn:
+        for name, query in ENDPOINT_QUERIES.items():
+            plan = query_plan(conn, query)
+            ok = not any(is_full_scan(detail) for detail in plan)
+            print(f"{'✅' if ok else '❌'} {name}")
+            for detail in plan:
+                print(f"      {detail}")
+            if not ok:
+                failed.append(name)
+    if failed:
+        print(f"❌ {len(failed)} queries do a full table scan: {', '.join(failed)}")
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_indexes() else 1)
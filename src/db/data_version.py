@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.db.database import get_async_session, get_session
+from src.db.models import DataVersion
+
+VERSION_ID = 1
+
+
+def bump_data_version() -> int:
+    """Increment the data version after an update, so cached API responses expire."""
+    table = DataVersion.__table__
+    now = datetime.now()
+    stmt = sqlite_insert(table).values(id=VERSION_ID, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={"version": table.c.version + 1, "updated_at": now},
+    )
+    session = get_session()
+    try:
+        session.execute(stmt)
+        version = session.execute(select(DataVersion.version).where(DataVersion.id == VERSION_ID)).scalar_one()
+        session.commit()
+    finally:
+        session.close()
+    print(f"🔖 Data version bumped to {version}")
+    return version
+
+
+async def read_data_version() -> int:
+    async with get_async_session() as db:
+        version = (await db.execute(select(DataVersion.version).where(DataVersion.id == VERSION_ID))).scalar()
+    return version or 0
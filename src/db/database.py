@@ -1,14 +1,87 @@
-from sqlalchemy import create_engine
+import os
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 
 from src.db.models import Base
+from src.db.migrations import upgrade
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/realty.db")
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+# Applied to every new SQLite connection. WAL lets the API keep reading while
+# the monthly ingest writes to the same file; busy_timeout makes a second
+# writer wait for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 30_000,
+}
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record=None):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_options(url, pool_size, max_overflow):
+    options = {"pool_size": pool_size, "max_overflow": max_overflow}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database and url.database != ":memory:":
+            Path(url.database).parent.mkdir(parents=True, exist_ok=True)
+        else:
+            options = {"connect_args": options["connect_args"]}
+    return options
+
 
-DATABASE_URL = "sqlite:///./data/realty.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def create_db_engine(url=DATABASE_URL, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW):
+    """Engine for `url`; SQLite files get the pragmas above and a sized pool."""
+    url = make_url(url)
+    engine = create_engine(url, **_engine_options(url, pool_size, max_overflow))
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+def async_url(url):
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db; URLs with an explicit driver are kept."""
+    url = make_url(url)
+    if url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def create_async_db_engine(url=DATABASE_URL, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW):
+    """Async engine for the API, same file, pool settings and pragmas as create_db_engine."""
+    url = async_url(url)
+    engine = create_async_engine(url, **_engine_options(url, pool_size, max_overflow))
+    if url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(bind=engine)
 
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    upgrade(engine)
 
 def get_session() -> Session:
-    return SessionLocal()
\ No newline at end of file
+    return SessionLocal()
+
+def get_async_session() -> AsyncSession:
+    return AsyncSessionLocal()
@@ -0,0 +1,82 @@
+import re
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+# FTS5 virtual tables are not created by create_all(), so they live outside Base.metadata
+fulltext_metadata = MetaData()
+
+
+def _fts(name):
+    return Table(
+        name, fulltext_metadata,
+        Column("rowid", Integer, primary_key=True),  # = <listings table>.id
+        Column("listing_text", Text),
+    )
+
+
+FTS_TABLES = {
+    "rent_listings": _fts("rent_listings_fts"),
+    "sell_listings": _fts("sell_listings_fts"),
+}
+
+# The searchable text of a listing. Disposition goes first so "2+1" cannot
+# match the "2" of "Praha 2" followed by a "1+kk"; amenities are indexed in
+# Czech and English, and the tokenizer folds diacritics (lodžie = lodzie).
+LISTING_TEXT = (
+    "coalesce(disposition, '') || ' ' || coalesce(district, '') || ' ' "
+    "|| coalesce(nearest_metro, '') || ' ' || coalesce(furnishing, '')"
+    " || CASE WHEN balcony THEN ' balkon balcony' ELSE '' END"
+    " || CASE WHEN loggia THEN ' lodzie loggia' ELSE '' END"
+    " || CASE WHEN garage THEN ' garaz garage parking' ELSE '' END"
+    " || CASE WHEN mhd THEN ' mhd' ELSE '' END"
+)
+
+
+def create_fts_tables(engine: Engine):
+    """Create missing FTS5 tables and fill them from the listings they index."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, fts in FTS_TABLES.items():
+            if not inspector.has_table(table_name) or inspector.has_table(fts.name):
+                continue
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {fts.name} USING fts5(listing_text, "
+                f"tokenize='unicode61 remove_diacritics 2')"
+            ))
+            conn.execute(text(f"INSERT INTO {fts.name}(rowid, listing_text) SELECT id, {LISTING_TEXT} FROM {table_name}"))
+            print(f"Migrated: created FTS5 {fts.name}")
+
+
+def sync_fts(session, table_name, external_ids):
+    """Rewrite the indexed text of `external_ids` from their current columns."""
+    if not external_ids:
+        return
+    session.execute(text(
+        f"INSERT OR REPLACE INTO {FTS_TABLES[table_name].name}(rowid, listing_text) "
+        f"SELECT id, {LISTING_TEXT} FROM {table_name} WHERE external_id IN :external_ids"
+    ).bindparams(bindparam("external_ids", expanding=True)), {"external_ids": list(external_ids)})
+
+
+def phrase_prefix(term):
+    """'2+kk' -> '"2 kk"*': the words of `term`, in order, the last one as a prefix.
+    Only word characters reach the MATCH expression, so user input cannot break its syntax."""
+    words = re.findall(r"\w+", term or "")
+    return f'"{" ".join(words)}"*' if words else None
+
+
+def fts_match(*phrases):
+    """AND of the non-empty phrases, or None when nothing is left to match."""
+    phrases = [p for p in phrases if p]
+    return " AND ".join(phrases) if phrases else None
+
+
+def keyword_match(q):
+    """Free-text search: every whitespace-separated word of `q` must match."""
+    return fts_match(*(phrase_prefix(word) for word in (q or "").split()))
+
+
+def text_search(query, Model, match):
+    """Restrict a select()/Query over `Model` to rows whose listing text matches `match`."""
+    fts = FTS_TABLES[Model.__tablename__]
+    return query.join(fts, fts.c.rowid == Model.id).where(fts.c.listing_text.op("MATCH")(match))
@@ -0,0 +1,86 @@
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from src.db.models import Base, ListingAggregate
+from src.db.fulltext import create_fts_tables
+from src.db.spatial import create_rtrees
+
+
+def add_missing_columns(engine: Engine):
+    """create_all() never alters existing tables, so add columns declared on
+    the models that an older database file does not have yet."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"Migrated {table.name}: added column {column.name}")
+
+
+def create_missing_indexes(engine: Engine):
+    """Indexes declared on the models that an older database file lacks;
+    ANALYZE afterwards so the planner has statistics to pick them."""
+    inspector = inspect(engine)
+    created = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    created.append(index.name)
+        if created:
+            conn.execute(text("ANALYZE"))
+    for name in created:
+        print(f"Migrated: created index {name}")
+
+
+def backfill_canonical_ids(engine: Engine):
+    with engine.begin() as conn:
+        for table in ("rent_listings", "sell_listings"):
+            conn.execute(text(f"UPDATE {table} SET canonical_id = external_id WHERE canonical_id IS NULL"))
+
+
+def backfill_years_to_payback(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE sell_listings SET years_to_payback = ROUND(price / (predicted_rent_price * 12.0), 2) "
+            "WHERE years_to_payback IS NULL AND predicted_rent_price > 0"
+        ))
+
+
+def backfill_aggregates(engine: Engine):
+    """Build listing_aggregates for listing types that have none yet, so the
+    analytics endpoints do not come back empty until the next ingest."""
+    # imported here: src.db.aggregates needs src.db.database, which imports this module
+    from src.db.aggregates import write_aggregates
+
+    with Session(engine) as session:
+        for listing_type in ("rent", "sale"):
+            filled = session.execute(
+                select(ListingAggregate.listing_type).where(ListingAggregate.listing_type == listing_type).limit(1)
+            ).first()
+            if filled is None:
+                groups = write_aggregates(session, listing_type)
+                if groups:
+                    print(f"Migrated: built {groups} {listing_type} aggregates")
+        session.commit()
+
+
+def upgrade(engine: Engine):
+    add_missing_columns(engine)
+    backfill_canonical_ids(engine)
+    backfill_years_to_payback(engine)
+    create_rtrees(engine)
+    create_fts_tables(engine)
+    create_missing_indexes(engine)
+    backfill_aggregates(engine)
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
-from sqlalchemy import Boolean, DateTime, Float, Integer, String, Text, func
+from sqlalchemy import Boolean, Date, DateTime, Float, Index, Integer, String, Text, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 class Base(DeclarativeBase):
@@ -12,6 +12,8 @@ class RentListing(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     
     external_id: Mapped[str] = mapped_column(String(100), unique=True)
+    # external_id of the copy this flat is shown as when it is listed on several sources
+    canonical_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     source: Mapped[str] = mapped_column(String(50))
     
@@ -32,9 +34,11 @@ class RentListing(Base):
     distance_to_center: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     distance_to_metro_km: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     nearest_metro: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    poi_features: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     main_image: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     all_images: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
@@ -44,6 +48,8 @@ class SellListing(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     
     external_id: Mapped[str] = mapped_column(String(100), unique=True)
+    # external_id of the copy this flat is shown as when it is listed on several sources
+    canonical_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
     source: Mapped[str] = mapped_column(String(50))
     
@@ -64,10 +70,93 @@ class SellListing(Base):
     distance_to_center: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     distance_to_metro_km: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
     nearest_metro: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    poi_features: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
     main_image: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     all_images: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     predicted_rent_price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # price / (predicted_rent_price * 12), written together with predicted_rent_price
+    years_to_payback: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
     
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
+# Partial indexes repeat the WHERE terms of src/db/queries.py word for word,
+# otherwise SQLite will not consider them
+RENT_CANONICAL = RentListing.canonical_id == RentListing.external_id
+SELL_MARKETPLACE = (SellListing.canonical_id == SellListing.external_id) & SellListing.predicted_rent_price.isnot(None)
+
+Index("ix_rent_listings_district_disposition_price",
+      RentListing.district, RentListing.disposition, RentListing.price)
+Index("ix_rent_listings_canonical_disposition_price",
+      RentListing.disposition, RentListing.price, sqlite_where=RENT_CANONICAL)
+# Covering indexes for the price histograms, which read most of the table
+Index("ix_rent_listings_price_canonical",
+      RentListing.price, RentListing.canonical_id, RentListing.external_id)
+
+Index("ix_sell_listings_district_disposition_price",
+      SellListing.district, SellListing.disposition, SellListing.price)
+Index("ix_sell_listings_marketplace_district_disposition_price",
+      SellListing.district, SellListing.disposition, SellListing.price, sqlite_where=SELL_MARKETPLACE)
+Index("ix_sell_listings_marketplace_price", SellListing.price, sqlite_where=SELL_MARKETPLACE)
+Index("ix_sell_listings_marketplace_payback",
+      SellListing.years_to_payback, SellListing.price, sqlite_where=SELL_MARKETPLACE)
+Index("ix_sell_listings_price_rent_canonical",
+      SellListing.price, SellListing.predicted_rent_price, SellListing.canonical_id, SellListing.external_id)
+
+class ListingPriceHistory(Base):
+    __tablename__ = "listing_price_history"
+
+    listing_type: Mapped[str] = mapped_column(String(10), primary_key=True)
+    external_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    scrape_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    price: Mapped[int] = mapped_column(Integer)
+
+class ListingAggregate(Base):
+    """Per district x disposition summary of canonical listings above the price floor,
+    refreshed after each ingest (src/db/aggregates.py). NULL district/disposition is stored as ""."""
+    __tablename__ = "listing_aggregates"
+
+    listing_type: Mapped[str] = mapped_column(String(10), primary_key=True)
+    district: Mapped[str] = mapped_column(String(100), primary_key=True)
+    disposition: Mapped[str] = mapped_column(String(20), primary_key=True)
+    
+    listing_count: Mapped[int] = mapped_column(Integer)
+    price_sum: Mapped[int] = mapped_column(Integer)
+    price_min: Mapped[int] = mapped_column(Integer)
+    price_max: Mapped[int] = mapped_column(Integer)
+    price_p25: Mapped[float] = mapped_column(Float)
+    price_p50: Mapped[float] = mapped_column(Float)
+    price_p75: Mapped[float] = mapped_column(Float)
+    # listings with a balcony, and listings under the budget price of the listing type
+    balcony_count: Mapped[int] = mapped_column(Integer)
+    balcony_price_sum: Mapped[int] = mapped_column(Integer)
+    budget_count: Mapped[int] = mapped_column(Integer)
+    budget_price_sum: Mapped[int] = mapped_column(Integer)
+    
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class QuarantinedListing(Base):
+    """Scraped listings rejected by the outlier stage, kept for review instead of the listing tables."""
+    __tablename__ = "quarantined_listings"
+
+    listing_type: Mapped[str] = mapped_column(String(10), primary_key=True)
+    external_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    source: Mapped[str] = mapped_column(String(50))
+    reason: Mapped[str] = mapped_column(String(50))
+    
+    price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    price_per_m2: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    surface: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    disposition: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    district: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    
+    quarantined_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+class DataVersion(Base):
+    """Single-row counter bumped after every data update; cached API responses are keyed on it."""
+    __tablename__ = "data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -0,0 +1,165 @@
+from sqlalchemy import case, func, select, tuple_
+
+from src.db.models import ListingAggregate, SellListing
+from src.db.fulltext import keyword_match, text_search
+from src.db.spatial import RTREES
+
+MARKETPLACE_MIN_PRICE = 500000
+
+# Marketplace orderings; id breaks ties so each key is unique and can be a page cursor
+MARKETPLACE_SORT_KEYS = {
+    "price": (SellListing.price, SellListing.id),
+    "payback": (SellListing.years_to_payback, SellListing.price, SellListing.id),
+}
+
+# What a marketplace card shows; endpoints select these as plain rows
+# instead of loading whole SellListing objects
+MARKETPLACE_COLUMNS = (
+    SellListing.id,
+    SellListing.price,
+    SellListing.disposition,
+    SellListing.surface,
+    SellListing.district,
+    SellListing.furnishing,
+    SellListing.latitude,
+    SellListing.longitude,
+    SellListing.distance_to_center,
+    SellListing.distance_to_metro_km,
+    SellListing.nearest_metro,
+    SellListing.main_image,
+    SellListing.all_images,
+    SellListing.predicted_rent_price,
+    SellListing.years_to_payback,
+)
+
+
+def canonical(Model):
+    # a flat listed on several sources is shown only once
+    return Model.canonical_id == Model.external_id
+
+
+def marketplace_listings_query(district=None, min_price=None, max_price=None, disposition=None,
+                               max_payback=None, sort="price", q=None, after=None):
+    """MARKETPLACE_COLUMNS of sell listings with a predicted rent, cheapest first
+    or (sort="payback") quickest payback first; the limit is added by the caller.
+    `q` is a keyword search over the FTS5 listing text (district, metro, amenities...).
+    `after` is the sort key (see marketplace_sort_key) of the last listing of
+    the previous page: the query seeks past it instead of counting an offset."""
+    query = select(*MARKETPLACE_COLUMNS).where(
+        SellListing.price >= MARKETPLACE_MIN_PRICE,
+        canonical(SellListing),
+        SellListing.predicted_rent_price.isnot(None),
+    )
+    if district:
+        query = query.where(SellListing.district == district)
+    if min_price:
+        query = query.where(SellListing.price >= min_price)
+    if max_price:
+        query = query.where(SellListing.price <= max_price)
+    if disposition:
+        query = query.where(SellListing.disposition == disposition)
+    if max_payback:
+        query = query.where(SellListing.years_to_payback <= max_payback)
+    match = keyword_match(q)
+    if match:
+        query = text_search(query, SellListing, match)
+    if sort == "payback":
+        query = query.where(SellListing.years_to_payback.isnot(None))
+    key = MARKETPLACE_SORT_KEYS[sort]
+    if after is not None:
+        query = query.where(tuple_(*key) > tuple(after))
+    return query.order_by(*(column.asc() for column in key))
+
+
+def years_to_payback_expr(price, predicted_rent_price):
+    """SQL twin of services.predicting.years_to_payback: NULL without a positive rent."""
+    return case(
+        (predicted_rent_price > 0, func.round(price / (predicted_rent_price * 12.0), 2)),
+        else_=None,
+    )
+
+
+def marketplace_sort_key(listing, sort="price"):
+    return [getattr(listing, column.key) for column in MARKETPLACE_SORT_KEYS[sort]]
+
+
+def marketplace_bbox_query(min_lat, min_lon, max_lat, max_lon, district=None, min_price=None,
+                           max_price=None, disposition=None):
+    """marketplace_listings_query restricted to listings inside the bounding box,
+    found through the sell_listings R*Tree instead of a scan over latitude/longitude."""
+    rtree = RTREES["sell_listings"]
+    return (
+        marketplace_listings_query(district, min_price, max_price, disposition)
+        .join(rtree, rtree.c.id == SellListing.id)
+        .where(
+            rtree.c.min_lat >= min_lat, rtree.c.max_lat <= max_lat,
+            rtree.c.min_lon >= min_lon, rtree.c.max_lon <= max_lon,
+        )
+    )
+
+
+def marketplace_districts_query():
+    return (
+        select(SellListing.district)
+        .where(SellListing.district.isnot(None), SellListing.district != "", canonical(SellListing))
+        .distinct()
+        .order_by(SellListing.district.asc())
+    )
+
+
+def listing_by_id_query(listing_id):
+    return select(*MARKETPLACE_COLUMNS).where(SellListing.id == listing_id)
+
+
+def prices_query(Model):
+    return select(Model.price).where(canonical(Model))
+
+
+def payback_query():
+    return select(SellListing.price, SellListing.predicted_rent_price).where(canonical(SellListing))
+
+
+def district_aggregates_query(listing_type, count, price_sum, dispositions=None):
+    """Per-district count and average price from listing_aggregates. `count` and
+    `price_sum` pick the measure (all listings, balcony or budget ones)."""
+    listings = func.sum(count)
+    query = (
+        select(
+            ListingAggregate.district,
+            listings.label("count"),
+            (func.sum(price_sum) * 1.0 / listings).label("avg_price"),
+        )
+        .where(ListingAggregate.listing_type == listing_type, ListingAggregate.district != "")
+        .group_by(ListingAggregate.district)
+        .having(listings > 0)
+    )
+    if dispositions:
+        query = query.where(ListingAggregate.disposition.in_(dispositions))
+    return query
+
+
+def price_summary_query(listing_type, district=None):
+    """count / avg / min / max over listing_aggregates, optionally for districts matching `district`."""
+    listings = func.sum(ListingAggregate.listing_count)
+    query = select(
+        listings.label("count"),
+        (func.sum(ListingAggregate.price_sum) * 1.0 / listings).label("avg"),
+        func.min(ListingAggregate.price_min).label("min"),
+        func.max(ListingAggregate.price_max).label("max"),
+    ).where(ListingAggregate.listing_type == listing_type)
+    if district:
+        query = query.where(ListingAggregate.district.ilike(f"%{district}%"))
+    return query
+
+
+def disposition_aggregates_query(listing_type):
+    listings = func.sum(ListingAggregate.listing_count)
+    return (
+        select(
+            ListingAggregate.disposition,
+            listings.label("count"),
+            (func.sum(ListingAggregate.price_sum) * 1.0 / listings).label("average_price"),
+        )
+        .where(ListingAggregate.listing_type == listing_type, ListingAggregate.disposition != "")
+        .group_by(ListingAggregate.disposition)
+    )
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Float, Integer, MetaData, Table, bindparam, inspect, text
+from sqlalchemy.engine import Engine
+
+# R*Tree virtual tables are not created by create_all(), so they live outside Base.metadata
+spatial_metadata = MetaData()
+
+
+def _rtree(name):
+    return Table(
+        name, spatial_metadata,
+        Column("id", Integer, primary_key=True),  # = <listings table>.id
+        Column("min_lat", Float), Column("max_lat", Float),
+        Column("min_lon", Float), Column("max_lon", Float),
+    )
+
+
+RTREES = {
+    "rent_listings": _rtree("rent_listings_rtree"),
+    "sell_listings": _rtree("sell_listings_rtree"),
+}
+
+
+def create_rtrees(engine: Engine):
+    """Create missing R*Tree tables and fill them from the listings they index."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, rtree in RTREES.items():
+            if not inspector.has_table(table_name) or inspector.has_table(rtree.name):
+                continue
+            conn.execute(text(f"CREATE VIRTUAL TABLE {rtree.name} USING rtree(id, min_lat, max_lat, min_lon, max_lon)"))
+            conn.execute(text(
+                f"INSERT INTO {rtree.name} SELECT id, latitude, latitude, longitude, longitude "
+                f"FROM {table_name} WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            ))
+            print(f"Migrated: created R*Tree {rtree.name}")
+
+
+def sync_rtree(session, table_name, external_ids):
+    """Point the R*Tree entries of `external_ids` at their current coordinates;
+    listings that lost their coordinates are removed from it."""
+    if not external_ids:
+        return
+    rtree = RTREES[table_name].name
+    ids = {"external_ids": list(external_ids)}
+    session.execute(text(
+        f"INSERT OR REPLACE INTO {rtree} SELECT id, latitude, latitude, longitude, longitude "
+        f"FROM {table_name} WHERE external_id IN :external_ids "
+        f"AND latitude IS NOT NULL AND longitude IS NOT NULL"
+    ).bindparams(bindparam("external_ids", expanding=True)), ids)
+    session.execute(text(
+        f"DELETE FROM {rtree} WHERE id IN (SELECT id FROM {table_name} "
+        f"WHERE external_id IN :external_ids AND (latitude IS NULL OR longitude IS NULL))"
+    ).bindparams(bindparam("external_ids", expanding=True)), ids)
@@ -1,13 +1,26 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 from starlette.requests import Request
+from src.api.cache import ResponseCacheMiddleware
 from src.api.endpoints.analytics import router as analytics_router
 from src.api.endpoints.marketplace import router as marketplace_router
 from src.api.endpoints.predictor import router as predictor_router
 from src.api.endpoints.chatbot import router as chatbot_router
+from src.db import init_db, async_engine
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bring an older database file up to the current schema before serving
+    init_db()
+    yield
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ResponseCacheMiddleware)
 app.include_router(analytics_router)
 app.include_router(marketplace_router)
 app.include_router(predictor_router)
@@ -0,0 +1,297 @@
+from src.parsers.scraper import (
+    KNOWN_PAGES_TO_STOP,
+    iter_offset_windows,
+    iter_until_known,
+)
+
+BEZREALITKY_URL = 'https://api.bezrealitky.cz/graphql/'
+BEZREALITKY_HEADERS = {
+    "accept": "*/*",
+    "content-type": "application/json",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+}
+BEZREALITKY_QUERY = """
+    query AdvertList($locale: Locale!, $estateType: [EstateType], $offerType: [OfferType], $regionOsmIds: [ID], $limit: Int, $offset: Int, $order: ResultOrder , $disposition: [Disposition]) {
+        listAdverts(
+            locale: $locale,
+            estateType: $estateType,
+            offerType: $offerType,
+            regionOsmIds: $regionOsmIds,
+            limit: $limit,
+            offset: $offset,
+            order: $order,
+            disposition: $disposition,
+        ) {
+            list {
+                id
+                price
+                currency
+                estateType
+                offerType
+                address(locale: $locale)
+                tags(locale: $locale)
+                imageAltText(locale: $locale)
+                dataJson
+                surface
+                garage
+                disposition
+                gps {
+                    lat
+                    lng
+                }
+                mainImage {
+                    url(filter: RECORD_THUMB)
+                }
+                publicImages(limit: 5) {
+                    url(filter: RECORD_MAIN)
+                    }
+           }
+            totalCount
+        }
+    }
+    """
+
+SREALITY_URL = "https://www.sreality.cz/api/cs/v2/estates"
+SREALITY_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Accept": "application/json"
+}
+
+# Adverts per GraphQL request; the API accepts larger pages than the web UI's 15
+BEZREALITKY_PAGE_SIZE = 50
+# Records per chunk handed downstream by SourceAdapter.records()
+CHUNK_SIZE = 500
+
+ADAPTERS = {}
+
+
+def register_adapter(cls):
+    ADAPTERS[cls.source] = cls
+    return cls
+
+
+def parse_bezrealitky_ad(ad):
+    # furnishing/mhd/balcony/loggia are derived from tags in one pass by features.py
+    tags = ad.get("tags", [])
+    gps = ad.get("gps", {})
+    latitude = gps.get("lat")
+    longitude = gps.get("lng")
+
+    main_image_data = ad.get("mainImage")
+    main_image_url = main_image_data.get("url") if main_image_data else None
+
+    public_images_data = ad.get("publicImages", [])
+    all_images_urls = [img.get("url") for img in public_images_data if img.get("url")]
+
+    if not main_image_url and all_images_urls:
+        main_image_url = all_images_urls[0]
+
+    return {
+        "id": ad.get("id"),
+        "price": ad.get("price"),
+        "address": ad.get("address"),
+        "offerType": ad.get("offerType"),
+        "disposition": ad.get("disposition"),
+        "surface": ad.get("surface"),
+        "garage": ad.get("garage"),
+        "tags": tags,
+        "latitude": latitude,
+        "longitude": longitude,
+        "imageAltText": ad.get("imageAltText"),
+        "main_image": main_image_url,
+        "all_images": all_images_urls,
+    }
+
+
+def parse_sreality_estate(estate):
+    # furnishing/mhd/garage/balcony/loggia are derived from labelsAll in one pass by features.py
+    labels_all = estate.get("labelsAll", [])
+    images_links = estate.get("_links", {}).get("images", [])
+    image_urls = [img.get("href") for img in images_links if img.get("href")]
+    main_image = image_urls[0] if image_urls else "https://via.placeholder.com/400x300?text=No+Photo"
+
+    gps = estate.get("gps", {})
+    latitude = gps.get("lat")
+    longitude = gps.get("lon")
+    return {
+        "id": estate.get("hash_id"),
+        "locality": estate.get("locality"),
+        "price": estate.get("price"),
+        "name": estate.get("name"),
+        "city_raw": estate.get("seo", {}).get("locality"),
+        "labels_all": labels_all,
+        "gps": gps,
+        "latitude": latitude,
+        "longitude": longitude,
+        "main_image": main_image,       # Ссылка на главное фото
+        "all_images": image_urls,
+    }
+
+
+class SourceAdapter:
+    """One listing source for one offer type.
+
+    Subclasses describe how to fetch a page and turn its raw items into
+    normalized records; paging, retries, incremental stop and chunked
+    streaming are shared. `listing_type` is "rent" or "sale", matching
+    save_to_database.
+    """
+    source = None
+
+    def __init__(self, listing_type, known_ids=None, stop_after=KNOWN_PAGES_TO_STOP):
+        self.listing_type = listing_type
+        self.known_ids = known_ids
+        self.stop_after = stop_after
+
+    @property
+    def name(self):
+        return f"{self.source}_{self.listing_type}"
+
+    def offsets(self):
+        raise NotImplementedError
+
+    async def fetch_page(self, engine, offset):
+        raise NotImplementedError
+
+    def page_items(self, page):
+        return page
+
+    def item_id(self, item):
+        raise NotImplementedError
+
+    def parse(self, item):
+        raise NotImplementedError
+
+    def _page_ids(self, page):
+        return [self.item_id(item) for item in self.page_items(page)]
+
+    async def pages(self, engine, offsets=None, prefetched=None):
+        offsets = self.offsets() if offsets is None else offsets
+        fetch = lambda offset: self.fetch_page(engine, offset)
+        if self.known_ids is None:
+            for offset, page in (prefetched or {}).items():
+                yield page
+            remaining = [o for o in offsets if o not in (prefetched or {})]
+            async for _, page in iter_offset_windows(fetch, remaining):
+                yield page
+        else:
+            async for _, page in iter_until_known(fetch, offsets, self._page_ids, self.known_ids,
+                                                  self.source, self.stop_after, prefetched):
+                yield page
+
+    async def records(self, engine, chunk_size=CHUNK_SIZE):
+        """Yield normalized records in lists of at most `chunk_size`."""
+        chunk = []
+        async for page in self.pages(engine):
+            for item in self.page_items(page):
+                chunk.append(self.parse(item))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+
+@register_adapter
+class BezrealitkyAdapter(SourceAdapter):
+    source = "bezrealitky"
+    OFFER_TYPES = {"rent": "PRONAJEM", "sale": "PRODEJ"}
+
+    def __init__(self, listing_type, region_osm_id="R435514", page_size=BEZREALITKY_PAGE_SIZE, **kwargs):
+        super().__init__(listing_type, **kwargs)
+        self.region_osm_id = region_osm_id
+        self.page_size = page_size
+
+    async def fetch_page(self, engine, offset):
+        data = {
+            "query": BEZREALITKY_QUERY,
+            "variables": {
+                "locale": "CS",
+                "estateType": ["BYT"],
+                "offerType": [self.OFFER_TYPES[self.listing_type]],
+                "regionOsmIds": [self.region_osm_id],
+                "limit": self.page_size,
+                "offset": offset,
+                "order": "TIMEORDER_DESC"
+            }
+        }
+        response_json = await engine.post_json(BEZREALITKY_URL, headers=BEZREALITKY_HEADERS, json=data)
+        return response_json['data']['listAdverts']
+
+    def page_items(self, page):
+        return page['list']
+
+    def item_id(self, item):
+        return item.get("id")
+
+    def parse(self, item):
+        return parse_bezrealitky_ad(item)
+
+    async def pages(self, engine, offsets=None, prefetched=None):
+        # The first window tells us how many adverts there are; the rest go out at once
+        first = {}
+        async for offset, page in iter_offset_windows(lambda o: self.fetch_page(engine, o), [0]):
+            first[offset] = page
+        if not first:
+            return
+        total = first[0]['totalCount'] or 0
+        async for page in super().pages(engine, range(0, total, self.page_size), first):
+            yield page
+
+
+@register_adapter
+class SrealityAdapter(SourceAdapter):
+    source = "sreality"
+    CATEGORY_TYPES = {"rent": 2, "sale": 1}
+
+    def __init__(self, listing_type, pages=5, per_page=100, locality_region_id=10, **kwargs):
+        super().__init__(listing_type, **kwargs)
+        self.page_count = pages
+        self.per_page = per_page
+        self.locality_region_id = locality_region_id
+
+    def offsets(self):
+        return range(self.page_count)
+
+    async def fetch_page(self, engine, offset):
+        params = {
+            "category_main_cb": 1,
+            "category_type_cb": self.CATEGORY_TYPES[self.listing_type],
+            "per_page": self.per_page,
+            "locality_region_id": self.locality_region_id,
+            "page": offset
+        }
+        data = await engine.get_json(SREALITY_URL, headers=SREALITY_HEADERS, params=params)
+        return data['_embedded']['estates']
+
+    def item_id(self, item):
+        return item.get("hash_id")
+
+    def parse(self, item):
+        return parse_sreality_estate(item)
+
+
+def make_adapter(source, listing_type, **kwargs) -> SourceAdapter:
+    """Adapter of a registered `source` for "rent" or "sale"."""
+    if source not in ADAPTERS:
+        raise ValueError(f"Unknown source {source!r}, registered: {', '.join(ADAPTERS)}")
+    return ADAPTERS[source](listing_type, **kwargs)
+
+
+def default_adapters(sreality_rent_pages=100, sreality_sell_pages=50,
+                     bezrealitky_page_size=BEZREALITKY_PAGE_SIZE, **kwargs):
+    """The Prague crawl: (bez_rent, sre_rent, bez_sell, sre_sell).
+
+    Only Bezrealitky stops early on known ids: it is asked for TIMEORDER_DESC,
+    while Sreality pages come in no guaranteed order, so a known listing on an
+    early page says nothing about the pages behind it. Sreality is always
+    crawled up to its page count.
+    """
+    crawl = [
+        ("bezrealitky", "rent", {"page_size": bezrealitky_page_size}),
+        ("sreality", "rent", {"pages": sreality_rent_pages, "known_ids": None}),
+        ("bezrealitky", "sale", {"page_size": bezrealitky_page_size}),
+        ("sreality", "sale", {"pages": sreality_sell_pages, "known_ids": None}),
+    ]
+    return [make_adapter(source, listing_type, **{**kwargs, **options})
+            for source, listing_type, options in crawl]
@@ -1,31 +1,35 @@
 import pandas as pd
 import numpy as np
 import re
-import requests
-from sklearn.neighbors import NearestNeighbors
 import json
+from datetime import date, datetime
+import argparse
 import __main__
 import sys
 from src.services.my_classes import Encoder
+from src.services.predicting import predict_sell_rents
 
-from src.parsers.parser import (
-    parsing_bezreality_rent_data,
-    parse_sreality_rent_data,
-    parsing_bezrealitky_sell_data,
-    parse_sreality_sell_data
-)
+from src.parsers.parser import run_scrapers
+from src.parsers.http_cache import ResponseCache
+from src.parsers.metro import build_tree, load_metro_snapshot
+from src.parsers.enrichment import add_poi_features, load_poi_layers
+from src.parsers.features import extract_bezrealitky_features, extract_sreality_features
+from src.parsers.outliers import split_outliers
+from src.parsers.pipeline import PipelineRun, prune_runs
+from scipy.sparse import coo_matrix
+from sklearn.neighbors import BallTree
+from scipy.sparse.csgraph import connected_components
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from src.db import init_db, get_session 
-from src.db import RentListing, SellListing
+from src.db.aggregates import has_aggregates, refresh_aggregates
+from src.db.data_version import bump_data_version
+from src.db.fulltext import sync_fts
+from src.db.queries import years_to_payback_expr
+from src.db.spatial import sync_rtree
+from src.db import RentListing, SellListing, ListingPriceHistory, QuarantinedListing
     
 
-def delete_outliers(df , column, k=1.5):
-    q1 = df.groupby('disposition')[column].transform(lambda s: s.quantile(0.25))
-    q3 = df.groupby('disposition')[column].transform(lambda s: s.quantile(0.75))
-    iqr = q3-q1
-    lo = q1 - k*iqr
-    hi = q3 + k*iqr
-    return df[(df[column] >= lo) & (df[column] <= hi)].copy()
-
 def extract_district(locality):
     if pd.isna(locality):
         return None
@@ -51,166 +55,546 @@ def normalize_disposition(val):
     return mapping.get(val, val)
 
 
+EARTH_RADIUS_KM = 6371.0088
+
+
 def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0088
+    R = EARTH_RADIUS_KM
     phi1, phi2 = np.radians(lat1), np.radians(lat2)
     dphi, dlmb = np.radians(lat2 - lat1), np.radians(lon2 - lon1)
     a = np.sin(dphi/2)**2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb/2)**2
     return 2 * R * np.arcsin(np.sqrt(a))
 
 
-def load_prague_metro_stations():
-    URL = "https://data.pid.cz/stops/json/stops.json"
+# Copies of one flat on different sources: same disposition, price within 3 %,
+# surface within 3 m², coordinates within 150 m
+DEDUP_PRICE_TOLERANCE = 0.03
+DEDUP_SURFACE_TOLERANCE = 3
+DEDUP_MAX_DISTANCE_KM = 0.15
+
+
+def listing_source(df: pd.DataFrame):
+    if "source" in df.columns:
+        return df["source"].astype(str).to_numpy()
+    if "address" in df.columns:
+        return np.where(df["address"].notna(), "bezrealitky", "sreality")
+    return np.full(len(df), "sreality")
+
+
+def load_dedup_reference(Model) -> pd.DataFrame:
+    session = get_session()
     try:
-        raw = requests.get(URL, timeout=30).json()
-        groups = pd.json_normalize(raw["stopGroups"]).rename(columns={
-            "name": "station_name", "avgLat": "latitude", "avgLon": "longitude"
-        })
-        metro = groups[groups["mainTrafficType"].astype(str).str.contains("metro", case=False, na=False)]
-        return metro[["station_name", "latitude", "longitude"]].dropna().reset_index(drop=True)
-    except Exception as e:
-        print(f"⚠️ Error: {e}")
-        return pd.DataFrame()
+        rows = session.query(
+            Model.external_id, Model.source, Model.price, Model.surface, Model.disposition,
+            Model.latitude, Model.longitude, Model.canonical_id
+        ).all()
+    finally:
+        session.close()
+    return pd.DataFrame(rows, columns=["external_id", "source", "price", "surface", "disposition",
+                                       "latitude", "longitude", "canonical_id"])
+
+
+def mark_duplicates(df: pd.DataFrame, reference: pd.DataFrame = None) -> pd.DataFrame:
+    """Set `canonical_id` to the external id shared by copies of the same flat
+    listed on different sources (own id for unique listings).
 
+    Candidate pairs come from a haversine BallTree radius query per disposition,
+    so only listings within DEDUP_MAX_DISTANCE_KM are compared on price and
+    surface, wherever they sit relative to any grid. `reference`
+    holds listings already in the DB, so new adverts can join their groups.
+    """
+    if df.empty:
+        return df
+    candidates = pd.DataFrame({
+        "external_id": df["id"].astype(str),
+        "source": listing_source(df),
+        "price": pd.to_numeric(df["price"], errors="coerce"),
+        "surface": pd.to_numeric(df["surface"], errors="coerce"),
+        "disposition": df["disposition"].astype(object),
+        "latitude": df["latitude"],
+        "longitude": df["longitude"],
+        "canonical_id": None,
+    })
+    df["canonical_id"] = candidates["external_id"].to_numpy()
+    if reference is not None and not reference.empty:
+        reference = reference[~reference["external_id"].isin(candidates["external_id"])]
+        candidates = pd.concat([candidates, reference], ignore_index=True)
+
+    pool = candidates.dropna(subset=["price", "disposition", "latitude", "longitude"]).reset_index(drop=True)
+    pool = pool[pool["price"] > 0].reset_index(drop=True)
+    if pool.empty:
+        return df
+    pool["row"] = pool.index
 
-def add_nearest_metro_features(df, metro_df):
-    if df.empty or metro_df.empty:
+    radius = DEDUP_MAX_DISTANCE_KM / EARTH_RADIUS_KM
+    neighbour_pairs = []
+    for _, group in pool.groupby("disposition", sort=False):
+        coords = np.radians(group[["latitude", "longitude"]].to_numpy(dtype=float))
+        neighbours = BallTree(coords, metric="haversine").query_radius(coords, r=radius)
+        rows = group["row"].to_numpy()
+        neighbour_pairs.append(pd.DataFrame({
+            "row_a": np.repeat(rows, [len(n) for n in neighbours]),
+            "row_b": rows[np.concatenate(neighbours)],
+        }))
+    attributes = pool[["source", "price", "surface"]]
+    pairs = (
+        pd.concat(neighbour_pairs, ignore_index=True)
+        .join(attributes.add_suffix("_a"), on="row_a")
+        .join(attributes.add_suffix("_b"), on="row_b")
+    )
+    pairs = pairs[pairs["source_a"] < pairs["source_b"]]
+    price_ok = (pairs["price_a"] - pairs["price_b"]).abs() <= DEDUP_PRICE_TOLERANCE * pairs[["price_a", "price_b"]].max(axis=1)
+    surface_gap = (pairs["surface_a"] - pairs["surface_b"]).abs()
+    surface_ok = surface_gap.isna() | (surface_gap <= DEDUP_SURFACE_TOLERANCE)
+    matches = pairs[price_ok & surface_ok]
+    if matches.empty:
+        print("   🔁 No cross-source duplicates")
         return df
+
+    graph = coo_matrix((np.ones(len(matches)), (matches["row_a"], matches["row_b"])), shape=(len(pool), len(pool)))
+    _, labels = connected_components(graph, directed=False)
+    pool["group"] = labels
+    # Groups that already have a canonical listing in the DB keep it
+    pool["is_new"] = pool["canonical_id"].isna()
+    first = pool.sort_values(["is_new", "source", "external_id"]).groupby("group").first()
+    canonical = first["canonical_id"].fillna(first["external_id"])
+    pool["canonical"] = pool["group"].map(canonical)
+
+    mapping = pool.set_index("external_id")["canonical"]
+    df["canonical_id"] = df["canonical_id"].map(mapping).fillna(df["canonical_id"])
+    duplicates = int((df["canonical_id"] != df["id"].astype(str)).sum())
+    print(f"   🔁 Cross-source duplicates: {duplicates} of {len(df)}")
+    return df
+
+
+def load_prague_metro_stations():
+    stations, _ = load_metro_snapshot()
+    return stations
+
+
+def add_nearest_metro_features(df, metro_df, tree=None):
+    if df.empty:
+        return df
+    if metro_df.empty:
+        raise ValueError("No metro stations to compute distance_to_metro_km from")
     mask = df["latitude"].notna() & df["longitude"].notna()
     if not mask.any():
         return df
     
-    nn = NearestNeighbors(n_neighbors=1, metric="haversine", algorithm="ball_tree")
-    metro_coords = np.radians(metro_df[["latitude", "longitude"]])
-    nn.fit(metro_coords)
+    if tree is None:
+        tree = build_tree(metro_df)
     
-    apt_coords = np.radians(df.loc[mask, ["latitude", "longitude"]])
-    dist, idx = nn.kneighbors(apt_coords)
+    apt_coords = np.radians(df.loc[mask, ["latitude", "longitude"]].to_numpy())
+    dist, idx = tree.query(apt_coords, k=1)
     
     df.loc[mask, "distance_to_metro_km"] = (dist.flatten() * 6371).round(1)
-    df.loc[mask, "nearest_metro"] = metro_df.iloc[idx.flatten()]["station_name"].values
+    df.loc[mask, "nearest_metro"] = metro_df["station_name"].to_numpy()[idx.flatten()]
     
     return df
 
 
-def save_to_database(df: pd.DataFrame, listing_type: str):
+def load_known_ids():
     session = get_session()
+    try:
+        known = set()
+        for Model in (RentListing, SellListing):
+            known.update(session.query(Model.source, Model.external_id).all())
+        return known
+    finally:
+        session.close()
+
+
+UPSERT_BATCH_SIZE = 1000
+
+INT_COLUMNS = ["surface"]
+FLOAT_COLUMNS = ["price_per_m2", "latitude", "longitude", "distance_to_center", "distance_to_metro_km"]
+BOOL_COLUMNS = ["garage", "balcony", "loggia", "mhd"]
+TEXT_COLUMNS = ["disposition", "district", "furnishing", "nearest_metro", "main_image", "canonical_id"]
+
+
+# Raw scraper payloads that are parsed into columns during cleaning and never persisted
+PAYLOAD_COLUMNS = ["tags", "labels_all", "gps", "dataJson", "imageAltText", "name",
+                   "locality", "city_raw", "address", "offerType"]
+CATEGORY_COLUMNS = ["source", "district", "disposition", "furnishing", "nearest_metro"]
+# whole-number floats (NaN forces float64 on scrape) stored as nullable Int32
+WHOLE_NUMBER_COLUMNS = ["price", "surface"]
+
+
+def _nullable(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.notna(), None)
+
+
+def _images_json(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value) if isinstance(value, list) and value else None
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop raw payloads, keep image lists as JSON text and shrink dtypes:
+    low-cardinality strings become categories, whole-number and integer
+    columns the smallest int type. Coordinates and derived floats stay
+    float64 so stored values and content hashes do not change."""
+    df = df.drop(columns=PAYLOAD_COLUMNS, errors="ignore")
+    if "all_images" in df.columns:
+        df["all_images"] = df["all_images"].map(_images_json)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    for col in BOOL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype("boolean")
+    for col in WHOLE_NUMBER_COLUMNS:
+        if col in df.columns and df[col].dtype.kind == "f":
+            values = df[col]
+            if ((values.dropna() % 1) == 0).all() and values.abs().max(skipna=True) < 2**31:
+                df[col] = values.astype("Int32")
+    for col in df.select_dtypes("integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+def listing_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Cleaned frame -> one column per listings table column, ready for executemany."""
+    df = df[df["id"].notna()]
+    out = pd.DataFrame(index=df.index)
+    out["external_id"] = df["id"].astype(str)
+    out["source"] = listing_source(df)
+    out["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0).astype(int)
+
+    for col in INT_COLUMNS:
+        values = pd.to_numeric(df[col], errors="coerce") if col in df.columns else pd.Series(np.nan, index=df.index)
+        out[col] = _nullable(values.round().astype("Int64"))
+    for col in FLOAT_COLUMNS:
+        values = pd.to_numeric(df[col], errors="coerce") if col in df.columns else pd.Series(np.nan, index=df.index)
+        out[col] = _nullable(values.astype(float))
+    for col in BOOL_COLUMNS:
+        values = df[col] if col in df.columns else pd.Series(False, index=df.index)
+        out[col] = values.fillna(False).astype(bool)
+    for col in TEXT_COLUMNS:
+        out[col] = _nullable(df[col]) if col in df.columns else None
+
+    poi_cols = [c for c in df.columns if c.startswith("poi_")]
+    if poi_cols:
+        poi = df[poi_cols].round(3).astype(object).where(df[poi_cols].notna(), None)
+        out["poi_features"] = [json.dumps(dict(zip(poi_cols, values))) for values in poi.itertuples(index=False)]
+    else:
+        out["poi_features"] = None
+
+    images = df["all_images"] if "all_images" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    out["all_images"] = images.map(_images_json)
+
+    return out.drop_duplicates("external_id", keep="last")
+
+
+def content_hashes(columns: pd.DataFrame) -> pd.Series:
+    """Stable 64-bit hash (hex) of each row's material fields."""
+    material = columns.drop(columns=["external_id", "source"], errors="ignore")
+    hashed = pd.util.hash_pandas_object(material, index=False)
+    return hashed.map("{:016x}".format)
+
+
+def save_to_database(df: pd.DataFrame, listing_type: str):
+    """Upsert the cleaned frame in batches of INSERT ... ON CONFLICT(external_id) DO UPDATE.
+
+    Only new rows and rows whose content hash changed are written (and their
+    R*Tree and FTS5 entries synced), and every new or changed price is appended to
+    listing_price_history for today.
+    Returns {"inserted", "updated", "unchanged", "skipped", "changed_ids", "districts"},
+    where "districts" holds the old and new district ("" for none) of every written row.
+    """
     Model = RentListing if listing_type == "rent" else SellListing
-    
-    saved_count = 0
-    skipped_count = 0
-    all_images_json = None
-    
-    for _, row in df.iterrows():
-        if pd.isna(row.get("id")):
-            skipped_count += 1
-            continue
-        if "address" in row and pd.notna(row.get("address")):
-            source = "bezrealitky"
-        else:
-            source = "sreality"
-        external_id = str(row["id"])
-        
-        existing = session.query(Model).filter_by(
-            external_id=external_id, 
-            source=source
-        ).first()
-        if existing:
-            skipped_count += 1
-            continue
-        if row.get("all_images") and isinstance(row["all_images"], list):
-            all_images_json = json.dumps(row["all_images"])
-        
-        listing = Model(
-            external_id=external_id,
-            source=source,
-            price=int(row["price"]) if pd.notna(row.get("price")) else 0,
-            price_per_m2=float(row["price_per_m2"]) if pd.notna(row.get("price_per_m2")) else None,
-            disposition=row.get("disposition"),
-            surface=int(row["surface"]) if pd.notna(row.get("surface")) else None,
-            district=row.get("district"),
-            furnishing=row.get("furnishing"),
-            garage=bool(row.get("garage", False)),
-            balcony=bool(row.get("balcony", False)),
-            loggia=bool(row.get("loggia", False)),
-            mhd=bool(row.get("mhd", False)),
-            latitude=float(row["latitude"]) if pd.notna(row.get("latitude")) else None,
-            longitude=float(row["longitude"]) if pd.notna(row.get("longitude")) else None,
-            distance_to_center=float(row["distance_to_center"]) if pd.notna(row.get("distance_to_center")) else None,
-            distance_to_metro_km=float(row["distance_to_metro_km"]) if pd.notna(row.get("distance_to_metro_km")) else None,
-            nearest_metro=row.get("nearest_metro"),
-            main_image=row.get("main_image"),
-            all_images=all_images_json
-        )
-   
-        session.add(listing)
-        saved_count += 1    
-    
-    session.commit()
-    
-    session.close()
-    
-    print(f"   💾 Saved: {saved_count}, skipped bcs of dublicates: {skipped_count}")
+    table = Model.__table__
+    history = ListingPriceHistory.__table__
+    scrape_date = date.today()
 
+    columns = listing_columns(df)
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0,
+             "skipped": len(df) - len(columns), "changed_ids": [], "districts": set()}
+    if columns.empty:
+        print(f"   💾 Nothing to save, skipped: {stats['skipped']}")
+        return stats
+    columns["content_hash"] = content_hashes(columns)
 
-def run_cleaning():
-    print("DB initialization...")
-    init_db()
-    
-    print("Parsing Bezrealitky rent data...")
-    df_bez_rent = parsing_bezreality_rent_data()
-    
-    print("parsing Sreality rent data...")
-    df_sre_rent = parse_sreality_rent_data(100)
-    
-    print("Parsing Bezrelitky sell data...")
-    df_bez_sell = parsing_bezrealitky_sell_data()
-    
-    print("Parsing Srealitky sell data...")
-    df_sre_sell = parse_sreality_sell_data(50)
-    
+    update_cols = [c for c in columns.columns if c != "external_id"]
+    stmt = sqlite_insert(table)
+    set_ = {c: stmt.excluded[c] for c in update_cols}
+    if Model is SellListing:
+        # a new price against the stored rent, so the payback sort is never
+        # stale even when the predict stage is skipped (no model)
+        set_["years_to_payback"] = years_to_payback_expr(stmt.excluded.price, table.c.predicted_rent_price)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.external_id],
+        set_=set_,
+        where=table.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+    )
+    history_stmt = sqlite_insert(history)
+    history_stmt = history_stmt.on_conflict_do_update(
+        index_elements=[history.c.listing_type, history.c.external_id, history.c.scrape_date],
+        set_={"price": history_stmt.excluded.price},
+    )
+
+    session = get_session()
+    try:
+        for start in range(0, len(columns), UPSERT_BATCH_SIZE):
+            batch = columns.iloc[start:start + UPSERT_BATCH_SIZE]
+            existing = pd.DataFrame(
+                session.execute(
+                    select(table.c.external_id, table.c.price, table.c.content_hash, table.c.district)
+                    .where(table.c.external_id.in_(batch["external_id"].tolist()))
+                ).all(),
+                columns=["external_id", "old_price", "old_hash", "old_district"],
+            )
+            merged = batch.merge(existing, on="external_id", how="left")
+            is_new = merged["old_hash"].isna() & merged["old_price"].isna()
+            is_changed = ~is_new & (merged["old_hash"] != merged["content_hash"])
+            price_moved = is_new | (is_changed & (merged["old_price"] != merged["price"]))
+
+            to_write = merged[is_new | is_changed]
+            if not to_write.empty:
+                session.execute(stmt, to_write[columns.columns].to_dict("records"))
+                written_ids = to_write["external_id"].tolist()
+                sync_rtree(session, table.name, written_ids)
+                sync_fts(session, table.name, written_ids)
+            moved = merged.loc[price_moved, ["external_id", "price"]]
+            if not moved.empty:
+                moved = moved.assign(listing_type=listing_type, scrape_date=scrape_date)
+                session.execute(history_stmt, moved.to_dict("records"))
+
+            stats["inserted"] += int(is_new.sum())
+            stats["updated"] += int(is_changed.sum())
+            stats["unchanged"] += int((~is_new & ~is_changed).sum())
+            stats["changed_ids"].extend(to_write["external_id"].tolist())
+            stats["districts"].update(to_write["district"].fillna(""))
+            stats["districts"].update(to_write.loc[~is_new, "old_district"].fillna(""))
+        session.commit()
+    finally:
+        session.close()
 
+    print(f"   💾 Inserted: {stats['inserted']}, updated: {stats['updated']}, "
+          f"unchanged: {stats['unchanged']}, skipped: {stats['skipped']}")
+    return stats
+
+
+QUARANTINE_COLUMNS = ["listing_type", "external_id", "source", "reason", "price",
+                      "price_per_m2", "surface", "disposition", "district"]
+
+
+def quarantine_frame(df: pd.DataFrame, listing_type: str) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    out = pd.DataFrame({
+        "listing_type": listing_type,
+        "external_id": df["id"].astype(str),
+        "source": listing_source(df),
+        "reason": df["reason"],
+    })
+    for col in ["price", "price_per_m2", "surface", "disposition", "district"]:
+        out[col] = df[col] if col in df.columns else None
+    return out
+
+
+def save_quarantine(quarantine: pd.DataFrame):
+    """Upsert rejected rows into quarantined_listings, latest reason and values win."""
+    if quarantine.empty:
+        return 0
+    table = QuarantinedListing.__table__
+    rows = quarantine.drop_duplicates(["listing_type", "external_id"], keep="last")
+    rows = rows.astype(object).where(rows.notna(), None).assign(quarantined_at=datetime.now())
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.listing_type, table.c.external_id],
+        set_={c.name: stmt.excluded[c.name] for c in table.columns if not c.primary_key},
+    )
+    session = get_session()
+    try:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            session.execute(stmt, rows.iloc[start:start + UPSERT_BATCH_SIZE].to_dict("records"))
+        session.commit()
+    finally:
+        session.close()
+    print(f"   🚧 Quarantined: {len(rows)}")
+    return len(rows)
+
+
+def scrape_stage(full_crawl=False, cache=None, replay=False):
+    known_ids = None
+    if not full_crawl:
+        known_ids = load_known_ids()
+        print(f"Incremental crawl, {len(known_ids)} listings already known")
+
+    print("Parsing Bezrealitky and Sreality rent/sell data...")
+    df_bez_rent, df_sre_rent, df_bez_sell, df_sre_sell = run_scrapers(
+        sreality_rent_pages=100, sreality_sell_pages=50, known_ids=known_ids,
+        cache=cache, replay=replay
+    )
+    return {"bez_rent": df_bez_rent, "sre_rent": df_sre_rent,
+            "bez_sell": df_bez_sell, "sre_sell": df_sre_sell}
+
+
+def clean_stage(df_bez_rent, df_sre_rent, df_bez_sell, df_sre_sell):
     for df in [df_sre_rent, df_sre_sell]:
+        if df.empty:
+            continue
+        extract_sreality_features(df)
         df['district'] = df['locality'].apply(extract_district)
         df['disposition'] = df['name'].str.extract(r'(\d+\+?kk|\d+\+\d+)')
         df['surface'] = pd.to_numeric(df['name'].str.extract(r'(\d+)\s?m²')[0], errors='coerce')
-    
+        df['source'] = "sreality"
 
     for df in [df_bez_rent, df_bez_sell]:
+        if df.empty:
+            continue
+        extract_bezrealitky_features(df)
+        df['source'] = "bezrealitky"
         df['district'] = df['address'].str.split('-').str[-1].str.strip()
         df['disposition'] = df['disposition'].apply(normalize_disposition)
-    
- 
+
     rent_df = pd.concat([df_bez_rent, df_sre_rent], ignore_index=True)
     sell_df = pd.concat([df_bez_sell, df_sre_sell], ignore_index=True)
-    
+    for df in [rent_df, sell_df]:
+        if "id" in df.columns:
+            # Bezrealitky ids are strings, Sreality hash_ids integers
+            df['id'] = df['id'].astype(str)
+    return {"rent": compact_frame(rent_df), "sell": compact_frame(sell_df)}
 
 
+def enrich_stage(rent_df, sell_df):
     CBD_LAT, CBD_LON = 50.08815, 14.41585
-    metro = load_prague_metro_stations()
-    
+    metro, metro_tree = load_metro_snapshot()
+    poi_layers = load_poi_layers()
+
     for df in [rent_df, sell_df]:
+        if df.empty:
+            continue
         df['price_per_m2'] = round(df['price'] / df['surface'], 1)
-        
+
         df['distance_to_center'] = round(
             haversine_km(df["latitude"], df["longitude"], CBD_LAT, CBD_LON), 1
         )
-        
-        add_nearest_metro_features(df, metro)
-        
-        df['furnishing'] = df['furnishing'].replace({
+
+        add_nearest_metro_features(df, metro, metro_tree)
+        add_poi_features(df, poi_layers)
+
+        df['furnishing'] = df['furnishing'].astype(object).replace({
             'partially_furnished': 'partly_furnished',
             'unknown': np.nan
         })
-    
-    print("Saving to DB...")
+    return {"rent": compact_frame(rent_df), "sell": compact_frame(sell_df)}
+
+
+def outlier_stage(rent_df, sell_df):
+    print("Filtering outliers...")
+    rent_df, rent_rejected = split_outliers(rent_df, "rent")
+    sell_df, sell_rejected = split_outliers(sell_df, "sale")
+    for name, rejected in [("rent", rent_rejected), ("sell", sell_rejected)]:
+        if not rejected.empty:
+            print(f"   🚧 {name}: {len(rejected)} outliers {rejected['reason'].value_counts().to_dict()}")
+    quarantine = pd.concat([
+        quarantine_frame(rent_rejected, "rent"),
+        quarantine_frame(sell_rejected, "sale"),
+    ], ignore_index=True)
+    return {"rent": rent_df, "sell": sell_df, "quarantine": quarantine}
+
+
+def dedup_stage(rent_df, sell_df):
+    print("Detecting cross-source duplicates...")
+    mark_duplicates(rent_df, load_dedup_reference(RentListing))
+    mark_duplicates(sell_df, load_dedup_reference(SellListing))
+    return {"rent": rent_df, "sell": sell_df}
+
+
+def _dirty_districts(listing_type, stats) -> pd.DataFrame:
+    dirty = [(listing_type, d) for d in sorted(stats["districts"])]
+    return pd.DataFrame(dirty, columns=["listing_type", "district"], dtype=str)
+
+
+# Rent and sale are saved as separate stages: each upsert commits on its own, so
+# its dirty districts must be checkpointed right away. Otherwise a run failing on
+# the sale upsert would resume with the rent rows unchanged and never refresh
+# the rent districts they touched.
+def save_rent_stage(rent_df, quarantine):
+    print("Saving rent listings to DB...")
+    save_quarantine(quarantine)
+    rent_stats = save_to_database(rent_df, "rent")
+    return {"dirty_districts": _dirty_districts("rent", rent_stats)}
+
+
+def save_sell_stage(sell_df):
+    print("Saving sell listings to DB...")
+    sell_stats = save_to_database(sell_df, "sale")
+    return {
+        "changed_sell": pd.DataFrame({"external_id": sell_stats["changed_ids"]}, dtype=str),
+        "dirty_districts": _dirty_districts("sale", sell_stats),
+    }
+
+
+def predict_stage(changed_sell):
+    print("Predicting rent for new and changed sell listings...")
+    predicted = predict_sell_rents(changed_sell["external_id"].tolist())
+    return {"predicted": pd.DataFrame({"count": [predicted]})}
+
+
+def aggregates_stage(dirty_districts):
+    """Refresh listing_aggregates for the districts touched by this run
+    (everything, the first time a listing type is aggregated)."""
+    print("Refreshing district aggregates...")
+    groups = {}
+    for listing_type in ("rent", "sale"):
+        districts = dirty_districts.loc[dirty_districts["listing_type"] == listing_type, "district"]
+        if not has_aggregates(listing_type):
+            groups[listing_type] = refresh_aggregates(listing_type)
+        elif not districts.empty:
+            groups[listing_type] = refresh_aggregates(listing_type, districts.tolist())
+    return {"aggregates": pd.DataFrame(list(groups.items()), columns=["listing_type", "groups"])}
+
+
+def run_cleaning(full_crawl=False, cache=None, replay=False, run_id=None):
+    """Scrape, clean, enrich, filter outliers, dedup, save, predict and aggregate
+    as checkpointed stages.
+
+    Pass the `run_id` of a failed run to resume it from the failed stage.
+    """
+    print("DB initialization...")
+    init_db()
+
+    cache_dir = str(cache.directory) if cache is not None else None
+    run = PipelineRun(run_id, full_crawl=full_crawl, replay=replay, cache_dir=cache_dir)
+    if run.resumed:
+        # a resumed scrape must fetch exactly what the original run asked for
+        full_crawl = run.params.get("full_crawl", full_crawl)
+        replay = run.params.get("replay", replay)
+        cache_dir = run.params.get("cache_dir", cache_dir)
+        cache = ResponseCache(cache_dir) if cache_dir else None
+
+    raw = run.stage("scrape", scrape_stage, full_crawl=full_crawl, cache=cache, replay=replay)
+    cleaned = run.stage("clean", clean_stage, raw["bez_rent"], raw["sre_rent"], raw["bez_sell"], raw["sre_sell"])
+    enriched = run.stage("enrich", enrich_stage, cleaned["rent"], cleaned["sell"])
+    filtered = run.stage("outliers", outlier_stage, enriched["rent"], enriched["sell"])
+    deduped = run.stage("dedup", dedup_stage, filtered["rent"], filtered["sell"])
+    saved_rent = run.stage("save_rent", save_rent_stage, deduped["rent"], filtered["quarantine"])
+    saved_sell = run.stage("save_sell", save_sell_stage, deduped["sell"])
+    run.stage("predict", predict_stage, saved_sell["changed_sell"])
+    dirty_districts = pd.concat([saved_rent["dirty_districts"], saved_sell["dirty_districts"]], ignore_index=True)
+    run.stage("aggregates", aggregates_stage, dirty_districts)
+    run.finish()
+    prune_runs()
+
+    return deduped["rent"], deduped["sell"]
 
-    save_to_database(rent_df, "rent")
-    
-    save_to_database(sell_df, "sale")
-    
-    return rent_df, sell_df
-    
 
 if __name__ == "__main__":
-    run_cleaning()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape, clean and store Prague listings")
+    parser.add_argument("--full", action="store_true", help="crawl the whole market")
+    parser.add_argument("--cache", action="store_true", help="reuse and fill the on-disk HTTP cache")
+    parser.add_argument("--replay", action="store_true", help="use cached responses only, no network")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                        help="resume a pipeline run from its first unfinished stage (default: latest run)")
+    args = parser.parse_args()
+    run_cleaning(
+        full_crawl=args.full or args.replay,
+        cache=ResponseCache() if args.cache or args.replay else None,
+        replay=args.replay,
+        run_id=args.resume,
+    )
+    bump_data_version()
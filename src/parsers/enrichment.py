@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+POI_DIR = Path("./data/poi")
+# Optional {"<layer>": {"radii_m": [300, 1000]}} overrides next to the layer files
+LAYERS_CONFIG = "layers.json"
+DEFAULT_RADII_M = (500,)
+EARTH_RADIUS_KM = 6371.0088
+
+
+class PoiLayer:
+    """Points of one kind (tram stops, schools, parks...) with a haversine BallTree."""
+
+    def __init__(self, name, latitudes, longitudes, radii_m=DEFAULT_RADII_M):
+        self.name = name
+        self.radii_m = tuple(radii_m)
+        coords = np.column_stack([latitudes, longitudes]).astype(float)
+        self.size = len(coords)
+        self.tree = BallTree(np.radians(coords), metric="haversine")
+
+    @property
+    def columns(self):
+        return [f"poi_{self.name}_km"] + [f"poi_{self.name}_{r}m" for r in self.radii_m]
+
+
+def _geometry_point(geometry):
+    """(lat, lon) of a GeoJSON geometry; polygons and lines use their vertex mean."""
+    if not geometry:
+        return None
+    kind, coords = geometry.get("type"), geometry.get("coordinates")
+    if kind == "Point":
+        points = [coords]
+    elif kind in ("MultiPoint", "LineString"):
+        points = coords
+    elif kind == "Polygon":
+        points = coords[0]
+    elif kind == "MultiPolygon":
+        points = [p for polygon in coords for p in polygon[0]]
+    else:
+        return None
+    if not points:
+        return None
+    lon, lat = np.asarray(points, dtype=float)[:, :2].mean(axis=0)
+    return lat, lon
+
+
+def read_geojson(path: Path) -> pd.DataFrame:
+    features = json.loads(path.read_text(encoding="utf-8")).get("features", [])
+    points = [p for p in (_geometry_point(f.get("geometry")) for f in features) if p]
+    return pd.DataFrame(points, columns=["latitude", "longitude"])
+
+
+def read_csv_points(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df = df.rename(columns={"lat": "latitude", "lon": "longitude", "lng": "longitude"})
+    return df[["latitude", "longitude"]]
+
+
+def load_poi_layers(directory=POI_DIR) -> list[PoiLayer]:
+    """One layer per *.geojson / *.csv file in `directory`, named after the file."""
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    config_path = directory / LAYERS_CONFIG
+    config = json.loads(config_path.read_text()) if config_path.exists() else {}
+
+    layers = []
+    for path in sorted(directory.iterdir()):
+        if path.suffix == ".geojson":
+            points = read_geojson(path)
+        elif path.suffix == ".csv":
+            points = read_csv_points(path)
+        else:
+            continue
+        points = points.dropna()
+        if points.empty:
+            print(f"⚠️ POI layer {path.name} has no points, skipped")
+            continue
+        radii = config.get(path.stem, {}).get("radii_m", DEFAULT_RADII_M)
+        layers.append(PoiLayer(path.stem, points["latitude"], points["longitude"], radii))
+        print(f"📍 POI layer {path.stem}: {len(points)} points")
+    return layers
+
+
+def add_poi_features(df: pd.DataFrame, layers: list[PoiLayer]) -> pd.DataFrame:
+    """Nearest distance (km) and within-radius counts for every layer, in one
+    batched tree query per layer and radius over all listings with coordinates."""
+    if df.empty or not layers:
+        return df
+    mask = (df["latitude"].notna() & df["longitude"].notna()).to_numpy()
+    coords = np.radians(df.loc[mask, ["latitude", "longitude"]].to_numpy(dtype=float))
+
+    for layer in layers:
+        dist_col, *count_cols = layer.columns
+        df[dist_col] = np.nan
+        if coords.size:
+            dist, _ = layer.tree.query(coords, k=1)
+            df.loc[mask, dist_col] = (dist[:, 0] * EARTH_RADIUS_KM).round(3)
+        for radius, col in zip(layer.radii_m, count_cols):
+            df[col] = pd.Series(pd.NA, index=df.index, dtype="Int32")
+            if coords.size:
+                counts = layer.tree.query_radius(coords, r=radius / 1000 / EARTH_RADIUS_KM, count_only=True)
+                df.loc[mask, col] = counts
+    return df
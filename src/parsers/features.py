@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# (tag, value) in priority order: the first tag present wins
+BEZREALITKY_FURNISHING = [
+    ("Vybaveno", "furnished"),
+    ("Částečně vybaveno", "partially_furnished"),
+    ("Nevybaveno", "unfurnished"),
+]
+# flag -> substring looked for in any tag
+BEZREALITKY_FLAGS = {
+    "mhd": "MHD",
+    "balcony": "Balkón",
+    "loggia": "Lodžie",
+}
+
+SREALITY_FURNISHING = [
+    ("furnished", "furnished"),
+    ("partly_furnished", "partly_furnished"),
+    ("not_furnished", "not_furnished"),
+]
+# flag -> exact label in the first (technical) labelsAll group
+SREALITY_TECH_FLAGS = {
+    "garage": "garage",
+    "loggia": "loggia",
+    "balcony": "balcony",
+}
+# any of these in the second (infrastructure) labelsAll group means public transport nearby
+SREALITY_MHD_LABELS = {"bus_public_transport", "tram", "metro", "train"}
+
+
+def multi_hot(lists: pd.Series, predicates: dict) -> pd.DataFrame:
+    """One boolean column per predicate: does any tag in the row's list match?
+
+    The lists are exploded once and every predicate is evaluated only on the
+    distinct tags, then broadcast back to rows through the factorized codes.
+    """
+    lists = lists.reset_index(drop=True)
+    exploded = lists.explode()
+    codes, uniques = pd.factorize(exploded)
+    table = np.array(
+        [[bool(pred(tag)) for pred in predicates.values()] for tag in uniques],
+        dtype=bool,
+    ).reshape(len(uniques), len(predicates))
+
+    hits = np.zeros((len(exploded), len(predicates)), dtype=bool)
+    valid = codes >= 0
+    hits[valid] = table[codes[valid]]
+
+    rows = np.zeros((len(lists), len(predicates)), dtype=bool)
+    np.logical_or.at(rows, exploded.index.to_numpy()[valid], hits[valid])
+    return pd.DataFrame(rows, columns=list(predicates))
+
+
+def _furnishing(hot: pd.DataFrame, levels, default):
+    conditions = [hot[f"furn_{value}"].to_numpy() for _, value in levels]
+    choices = np.array([value for _, value in levels], dtype=object)
+    return np.select(conditions, choices, default=default)
+
+
+def _as_lists(series: pd.Series) -> pd.Series:
+    return series.map(lambda v: v if isinstance(v, list) else [])
+
+
+def extract_bezrealitky_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add furnishing, mhd, balcony and loggia from the raw `tags` list column."""
+    if df.empty:
+        return df
+    predicates = {f"furn_{value}": (lambda t, tag=tag: t == tag) for tag, value in BEZREALITKY_FURNISHING}
+    predicates.update({flag: (lambda t, s=sub: s in t) for flag, sub in BEZREALITKY_FLAGS.items()})
+    hot = multi_hot(_as_lists(df["tags"]), predicates)
+
+    df["furnishing"] = _furnishing(hot, BEZREALITKY_FURNISHING, "unknown")
+    for flag in BEZREALITKY_FLAGS:
+        df[flag] = hot[flag].to_numpy()
+    return df
+
+
+def extract_sreality_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Add furnishing, mhd, garage, balcony and loggia from the raw `labels_all` column."""
+    if df.empty:
+        return df
+    labels = _as_lists(df["labels_all"])
+    tech = _as_lists(labels.str[0])
+    infra = _as_lists(labels.str[1])
+
+    predicates = {f"furn_{value}": (lambda t, tag=tag: t == tag) for tag, value in SREALITY_FURNISHING}
+    predicates.update({flag: (lambda t, l=label: t == l) for flag, label in SREALITY_TECH_FLAGS.items()})
+    hot = multi_hot(tech, predicates)
+    mhd = multi_hot(infra, {"mhd": lambda t: t in SREALITY_MHD_LABELS})
+
+    df["furnishing"] = _furnishing(hot, SREALITY_FURNISHING, None)
+    for flag in SREALITY_TECH_FLAGS:
+        df[flag] = hot[flag].to_numpy()
+    df["mhd"] = mhd["mhd"].to_numpy()
+    return df
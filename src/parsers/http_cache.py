@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import httpx
+
+HTTP_CACHE_DIR = Path("./data/http_cache")
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CacheMiss(httpx.RequestError):
+    """Raised in replay mode when a request has no cached response."""
+
+
+class ResponseCache:
+    """Content-addressed store of decoded JSON responses on disk.
+
+    Entries are keyed by method, URL, query params and JSON body (which holds
+    the GraphQL variables), expire after `ttl` seconds and are evicted oldest
+    first once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, url, params=None, json_body=None):
+        payload = json.dumps(
+            {"method": method.upper(), "url": url, "params": params, "json": json_body},
+            sort_keys=True, ensure_ascii=False, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key, ignore_ttl=False):
+        path = self._path(key)
+        try:
+            if not ignore_ttl and time.time() - path.stat().st_mtime > self.ttl:
+                self.misses += 1
+                return None
+            data = json.loads(path.read_bytes())
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp, path)
+
+    def evict(self):
+        if not self.directory.exists():
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.directory.glob("*/*.json"):
+            stat = path.stat()
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import requests
+from sklearn.neighbors import BallTree
+
+PID_STOPS_URL = "https://data.pid.cz/stops/json/stops.json"
+METRO_DIR = Path("./data/metro")
+STATIONS_FILE = METRO_DIR / "stations.csv"
+TREE_FILE = METRO_DIR / "stations_balltree.joblib"
+META_FILE = METRO_DIR / "meta.json"
+MAX_AGE_DAYS = 30
+
+
+def fetch_metro_stations() -> pd.DataFrame:
+    raw = requests.get(PID_STOPS_URL, timeout=30).json()
+    groups = pd.json_normalize(raw["stopGroups"]).rename(columns={
+        "name": "station_name", "avgLat": "latitude", "avgLon": "longitude"
+    })
+    metro = groups[groups["mainTrafficType"].astype(str).str.contains("metro", case=False, na=False)]
+    metro = metro[["station_name", "latitude", "longitude"]].dropna().reset_index(drop=True)
+    if metro.empty:
+        raise ValueError("PID stops.json contained no metro stations")
+    return metro
+
+
+def build_tree(stations: pd.DataFrame) -> BallTree:
+    return BallTree(np.radians(stations[["latitude", "longitude"]].to_numpy()), metric="haversine")
+
+
+def _read_meta():
+    try:
+        return json.loads(META_FILE.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _atomic_write(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def refresh_metro_snapshot() -> dict:
+    """Download the stations, then store them with a version stamp and a prebuilt BallTree."""
+    stations = fetch_metro_stations()
+    METRO_DIR.mkdir(parents=True, exist_ok=True)
+    csv_bytes = stations.to_csv(index=False).encode("utf-8")
+    version = hashlib.sha256(csv_bytes).hexdigest()[:12]
+
+    _atomic_write(STATIONS_FILE, lambda p: p.write_bytes(csv_bytes))
+    _atomic_write(TREE_FILE, lambda p: joblib.dump({"version": version, "tree": build_tree(stations)}, p))
+    meta = {
+        "version": version,
+        "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        "source": PID_STOPS_URL,
+        "stations": len(stations),
+    }
+    _atomic_write(META_FILE, lambda p: p.write_text(json.dumps(meta, indent=2)))
+    print(f"🚇 Metro snapshot {version} saved ({len(stations)} stations)")
+    return meta
+
+
+def load_metro_snapshot(max_age_days=MAX_AGE_DAYS):
+    """Return (stations, tree) from the local snapshot, refreshing it when it is
+    older than `max_age_days`. A failed refresh falls back to the existing
+    snapshot; with no snapshot at all it raises instead of returning nothing.
+    """
+    meta = _read_meta()
+    stale = (
+        meta is None
+        or not STATIONS_FILE.exists()
+        or datetime.now() - datetime.fromisoformat(meta["fetched_at"]) > timedelta(days=max_age_days)
+    )
+    if stale:
+        try:
+            meta = refresh_metro_snapshot()
+        except Exception as e:
+            if meta is None or not STATIONS_FILE.exists():
+                raise RuntimeError(f"No metro snapshot in {METRO_DIR} and download failed: {e}") from e
+            print(f"⚠️ Metro refresh failed, using snapshot {meta['version']} from {meta['fetched_at']}: {e}")
+
+    stations = pd.read_csv(STATIONS_FILE)
+    try:
+        cached = joblib.load(TREE_FILE)
+    except (FileNotFoundError, EOFError):
+        cached = None
+    if cached is None or cached.get("version") != meta["version"]:
+        cached = {"version": meta["version"], "tree": build_tree(stations)}
+        _atomic_write(TREE_FILE, lambda p: joblib.dump(cached, p))
+    return stations, cached["tree"]
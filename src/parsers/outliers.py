@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# listing_type -> column -> rule. `k` is the IQR fence multiplier within each
+# disposition; `min`/`max` are hard validity bounds checked for every row.
+OUTLIER_RULES = {
+    "rent": {
+        "price": {"k": 3.0, "min": 2000, "max": 500_000},
+        "price_per_m2": {"k": 3.0, "min": 50},
+        "surface": {"k": 3.0, "min": 10, "max": 1000},
+    },
+    "sale": {
+        "price": {"k": 3.0, "min": 500_000},
+        "price_per_m2": {"k": 3.0, "min": 10_000},
+        "surface": {"k": 3.0, "min": 10, "max": 2000},
+    },
+}
+# groups smaller than this get only the hard bounds, their quartiles mean little
+MIN_GROUP_SIZE = 10
+
+
+def outlier_reasons(df: pd.DataFrame, rules: dict, by="disposition", min_group=MIN_GROUP_SIZE) -> pd.Series:
+    """Why each row is rejected ("<column>_min", "<column>_max", "<column>_iqr"),
+    None for rows that pass. Quartiles for all columns and groups come from a
+    single grouped quantile([0.25, 0.75]) call; missing values never reject."""
+    reasons = pd.Series(None, index=df.index, dtype=object)
+    columns = [c for c in rules if c in df.columns]
+    if df.empty or not columns:
+        return reasons
+
+    # compact_frame stores price/surface as nullable Int32; compare as float64 so
+    # missing values are NaN (never rejected) instead of an ambiguous pd.NA
+    values = df[columns].apply(pd.to_numeric, errors="coerce").astype("float64")
+    keys = df[by].astype(object).fillna("unknown") if by in df.columns else pd.Series("all", index=df.index)
+    grouped = values.groupby(keys)
+    quartiles = grouped.quantile([0.25, 0.75])
+    q1 = quartiles.xs(0.25, level=-1)
+    q3 = quartiles.xs(0.75, level=-1)
+    k = pd.Series({c: rules[c].get("k", np.inf) for c in columns})
+    iqr = q3 - q1
+    # a zero spread (many identical prices) would fence off every other value
+    usable = (grouped.count() >= min_group) & (iqr > 0)
+    lo = (q1 - iqr * k).where(usable)
+    hi = (q3 + iqr * k).where(usable)
+    lo_rows = lo.reindex(keys).to_numpy(dtype=float, na_value=np.nan)
+    hi_rows = hi.reindex(keys).to_numpy(dtype=float, na_value=np.nan)
+
+    # fill in reverse so the first configured column wins
+    for i, col in reversed(list(enumerate(columns))):
+        v = values[col].to_numpy(dtype=float, na_value=np.nan)
+        rule = rules[col]
+        fence = (v < lo_rows[:, i]) | (v > hi_rows[:, i])
+        reasons[fence] = f"{col}_iqr"
+        if "max" in rule:
+            reasons[v > rule["max"]] = f"{col}_max"
+        if "min" in rule:
+            reasons[v < rule["min"]] = f"{col}_min"
+    return reasons
+
+
+def split_outliers(df: pd.DataFrame, listing_type: str, rules=None):
+    """(kept, quarantined) for one listing type; quarantined rows carry a `reason`."""
+    rules = OUTLIER_RULES[listing_type] if rules is None else rules
+    reasons = outlier_reasons(df, rules)
+    rejected = reasons.notna().to_numpy()
+    quarantined = df.loc[rejected].assign(reason=reasons[rejected])
+    return df.loc[~rejected].reset_index(drop=True), quarantined.reset_index(drop=True)
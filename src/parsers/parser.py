@@ -1,430 +1,65 @@
-import requests
+import asyncio
 import pandas as pd
-from requests.exceptions import RequestException
-def parsing_bezreality_rent_data():
-    url = 'https://api.bezrealitky.cz/graphql/'
 
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
-
-    all_data = []
-    limit = 15
-    offset = 0
-
-    while True:
-        data = {
-    "query": """
-    query AdvertList($locale: Locale!, $estateType: [EstateType], $offerType: [OfferType], $regionOsmIds: [ID], $limit: Int, $offset: Int, $order: ResultOrder , $disposition: [Disposition]) {
-        listAdverts(
-            locale: $locale,
-            estateType: $estateType,
-            offerType: $offerType,
-            regionOsmIds: $regionOsmIds,
-            limit: $limit,
-            offset: $offset,
-            order: $order, 
-            disposition: $disposition,
-           
-            
-        ) {
-            list {
-                id
-                price
-                currency
-                estateType
-                offerType
-                address(locale: $locale)
-                tags(locale: $locale)
-                imageAltText(locale: $locale)
-                dataJson
-                surface
-                garage
-                disposition
-                gps {
-                    lat
-                    lng
-                }  
-                mainImage {
-                    url(filter: RECORD_THUMB)
-                }
-                publicImages(limit: 5) {
-                    url(filter: RECORD_MAIN)
-                    } 
-           }    
-            totalCount
-        }
-    }
-    """,
-    "variables": {
-        "locale": "CS",
-        "estateType": ["BYT"],
-        "offerType": ["PRONAJEM"],
-        "regionOsmIds": ["R435514"],
-        "limit": limit,
-        "offset": offset,
-        "order": "TIMEORDER_DESC"
-    }
-
-        }
-
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
-
-            adverts = response_json['data']['listAdverts']['list']
-            if not adverts:
-                break
-
-            for ad in adverts:
-                tags = ad.get("tags", [])
-                if 'Vybaveno' in tags: # Furnished
-                    furnishing = 'furnished'
-                elif 'Částečně vybaveno' in tags: # Partially furnished
-                    furnishing = 'partially_furnished'
-                elif 'Nevybaveno' in tags: # Unfurnished
-                    furnishing = 'unfurnished'
-                else:
-                    furnishing = 'unknown'
-                mhd = any('MHD' in tag for tag in tags)
-                balcony=any('Balkón' in tag for tag in tags)
-                loggia=any('Lodžie' in tag for tag in tags)
-                gps = ad.get("gps", {})
-                latitude = gps.get("lat")
-                longitude = gps.get("lng")
-
-                main_image_data = ad.get("mainImage")
-                main_image_url = main_image_data.get("url") if main_image_data else None
-
-                public_images_data = ad.get("publicImages", [])
-                all_images_urls = [img.get("url") for img in public_images_data if img.get("url")]
-
-                if not main_image_url and all_images_urls:
-                 main_image_url = all_images_urls[0]
-
-                all_data.append({
-                    "id": ad.get("id"),
-                    "price": ad.get("price"),
-                    "address": ad.get("address"),
-                    "offerType": ad.get("offerType"),
-                    "disposition": ad.get("disposition"),
-                    "surface": ad.get("surface"),
-                    "garage": ad.get("garage"),
-                    "tags": tags,
-                    "furnishing": furnishing,
-                    "mhd": mhd,
-                    "balcony": balcony,
-                    "loggia": loggia,   
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "imageAltText": ad.get("imageAltText"),
-                    "main_image": main_image_url,
-                    "all_images": all_images_urls,
-                })
-
-            offset += limit
-
-        except RequestException as e:
-            print(f"Error: {e}")
-            break
-
-    df = pd.DataFrame(all_data)
-
-
-    print("Total records received:", len(df))
-    return df
-
-def parse_sreality_rent_data(pages=5):
-    url = "https://www.sreality.cz/api/cs/v2/estates"
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-
-    all_data = []
-    per_page = 100  
-    for page in range(pages):
-        params = {
-            "category_main_cb": 1,      
-            "category_type_cb": 2,     
-            "per_page": per_page,
-            "locality_region_id": 10,
-            "page": page
-        }
-
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()  
-            data = response.json()
-
-            estates = data['_embedded']['estates']
-
-            for estate in estates:
-                labels_all = estate.get("labelsAll", [])
-                tech_labels = labels_all[0] if len(labels_all) > 0 else []
-                infra_labels = labels_all[1] if len(labels_all) > 1 else []
-                images_links = estate.get("_links", {}).get("images", [])
-                image_urls = [img.get("href") for img in images_links if img.get("href")]
-                main_image = image_urls[0] if image_urls else "https://via.placeholder.com/400x300?text=No+Photo"
-
-               
-                if 'furnished' in tech_labels:
-                    furnishing = 'furnished'
-                elif 'partly_furnished' in tech_labels:
-                    furnishing = 'partly_furnished'
-                elif 'not_furnished' in tech_labels:
-                    furnishing = 'not_furnished'
-                else:
-                    furnishing = None
-
-                mhd_tag={'bus_public_transport', 'tram', 'metro' , 'train'}
-                mhd=any(tag in infra_labels for tag in mhd_tag)
-                garage=any('garage' in tech_labels for infa in tech_labels)
-                loggia=any('loggia' in tech_labels for infa in tech_labels)
-                balcony=any('balcony' in tech_labels for infa in tech_labels)
-                gps=estate.get("gps" , {})
-                latitude=gps.get("lat") 
-                longitude= gps.get("lon") 
-                all_data.append({
-                    "id":estate.get("hash_id"),
-                    "locality": estate.get("locality"),
-                    "price": estate.get("price"),
-                    "name": estate.get("name"),
-                    "city_raw": estate.get("seo", {}).get("locality"),
-                    "labels_all": labels_all,
-                    "furnishing": furnishing,
-                    "mhd": mhd,
-                    "garage": garage,
-                    "loggia": loggia,
-                    "balcony": balcony,
-                    "gps": gps,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "main_image": main_image,       # Ссылка на главное фото
-                    "all_images": image_urls,
-                })
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error while fetching page {page + 1}: {e}")
-            break
-
-    df = pd.DataFrame(all_data)
-    print("✅ Total listings fetched:", len(df))
+from src.parsers.adapters import (
+    BEZREALITKY_PAGE_SIZE,
+    CHUNK_SIZE,
+    default_adapters,
+    make_adapter,
+)
+from src.parsers.scraper import KNOWN_PAGES_TO_STOP, ScrapingEngine, run_async
+
+
+async def collect_frame(engine: ScrapingEngine, adapter, chunk_size=CHUNK_SIZE):
+    """All records of `adapter` as one DataFrame.
+
+    Raw pages are dropped chunk by chunk, but the parsed frame is still held in
+    full: cleaning, outliers and dedup work on whole frames. Consumers that can
+    work chunk-wise should iterate adapter.records() instead.
+    """
+    frames = [pd.DataFrame(chunk) async for chunk in adapter.records(engine, chunk_size)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    print(f"✅ {adapter.name}: {len(df)} listings fetched")
     return df
 
-def parsing_bezrealitky_sell_data():
-    url = 'https://api.bezrealitky.cz/graphql/'
-
-    headers = {
-        "accept": "*/*",
-        "content-type": "application/json",
-        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
-
-    all_data = []
-    limit = 15
-    offset = 0
 
-    while True:
-        data = {
-    "query": """
-    query AdvertList($locale: Locale!, $estateType: [EstateType], $offerType: [OfferType], $regionOsmIds: [ID], $limit: Int, $offset: Int, $order: ResultOrder , $disposition: [Disposition]) {
-        listAdverts(
-            locale: $locale,
-            estateType: $estateType,
-            offerType: $offerType,
-            regionOsmIds: $regionOsmIds,
-            limit: $limit,
-            offset: $offset,
-            order: $order, 
-            disposition: $disposition,
-           
-            
-        ) {
-            list {
-                id
-                price
-                currency
-                estateType
-                offerType
-                address(locale: $locale)
-                tags(locale: $locale)
-                imageAltText(locale: $locale)
-                dataJson
-                surface
-                garage
-                disposition
-                gps {
-                    lat
-                    lng
-                }  
-                mainImage {
-                    url(filter: RECORD_THUMB)
-                }
-                publicImages(limit: 5) {
-                    url(filter: RECORD_MAIN)
-                    } 
-           }    
-            totalCount
-        }
-    }
-    """,
-    "variables": {
-        "locale": "CS",
-        "estateType": ["BYT"],
-        "offerType": ["PRODEJ"],
-        "regionOsmIds": ["R435514"],
-        "limit": limit,
-        "offset": offset,
-        "order": "TIMEORDER_DESC"
-    }
+async def scrape(engine: ScrapingEngine, adapters, chunk_size=CHUNK_SIZE):
+    return await asyncio.gather(*(collect_frame(engine, a, chunk_size) for a in adapters))
 
-        }
 
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            response_json = response.json()
+def run_scrapers(sreality_rent_pages=100, sreality_sell_pages=50,
+                 bezrealitky_page_size=BEZREALITKY_PAGE_SIZE, known_ids=None,
+                 stop_after=KNOWN_PAGES_TO_STOP, cache=None, replay=False):
+    """Fetch all four sources concurrently.
 
-            adverts = response_json['data']['listAdverts']['list']
-            if not adverts:
-                break
+    With `known_ids` (a set of (source, external_id) pairs) Bezrealitky stops
+    paging once it only sees adverts we already have; None means a full crawl.
+    Sreality is always crawled in full, see default_adapters.
+    `cache` is a ResponseCache to read and fill; `replay=True` serves every
+    request from the cache only, for deterministic offline runs.
+    Returns (bez_rent, sre_rent, bez_sell, sre_sell) DataFrames.
+    """
+    adapters = default_adapters(sreality_rent_pages, sreality_sell_pages, bezrealitky_page_size,
+                                known_ids=known_ids, stop_after=stop_after)
+    return run_async(scrape, adapters, engine_options={"cache": cache, "replay": replay})
 
-            for ad in adverts:
-                tags = ad.get("tags", [])
-                if 'Vybaveno' in tags: # Furnished
-                    furnishing = 'furnished'
-                elif 'Částečně vybaveno' in tags: # Partially furnished
-                    furnishing = 'partially_furnished'
-                elif 'Nevybaveno' in tags: # Unfurnished
-                    furnishing = 'unfurnished'
-                else:
-                    furnishing = 'unknown'
-                mhd = any('MHD' in tag for tag in tags)
-                balcony=any('Balkón' in tag for tag in tags)
-                loggia=any('Lodžie' in tag for tag in tags)
-                gps = ad.get("gps", {})
-                latitude = gps.get("lat")
-                longitude = gps.get("lng")
 
-                main_image_data = ad.get("mainImage")
-                main_image_url = main_image_data.get("url") if main_image_data else None
+def _run_adapter(source, listing_type, cache, replay, **kwargs):
+    adapter = make_adapter(source, listing_type, **kwargs)
+    return run_async(collect_frame, adapter, engine_options={"cache": cache, "replay": replay})
 
-                public_images_data = ad.get("publicImages", [])
-                all_images_urls = [img.get("url") for img in public_images_data if img.get("url")]
 
-                if not main_image_url and all_images_urls:
-                 main_image_url = all_images_urls[0]
+def parsing_bezreality_rent_data(limit=BEZREALITKY_PAGE_SIZE, cache=None, replay=False):
+    return _run_adapter("bezrealitky", "rent", cache, replay, page_size=limit)
 
-                all_data.append({
-                    "id": ad.get("id"),
-                    "price": ad.get("price"),
-                    "address": ad.get("address"),
-                    "offerType": ad.get("offerType"),
-                    "disposition": ad.get("disposition"),
-                    "surface": ad.get("surface"),
-                    "garage": ad.get("garage"),
-                    "tags": tags,
-                    "furnishing": furnishing,
-                    "mhd": mhd,
-                    "balcony": balcony,
-                    "loggia": loggia,   
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "imageAltText": ad.get("imageAltText"),
-                    "main_image": main_image_url,
-                    "all_images": all_images_urls,
-                })
 
-            offset += limit
+def parse_sreality_rent_data(pages=5, cache=None, replay=False):
+    return _run_adapter("sreality", "rent", cache, replay, pages=pages)
 
-        except RequestException as e:
-            print(f"Error: {e}")
-            break
 
-    df = pd.DataFrame(all_data)
+def parsing_bezrealitky_sell_data(limit=BEZREALITKY_PAGE_SIZE, cache=None, replay=False):
+    return _run_adapter("bezrealitky", "sale", cache, replay, page_size=limit)
 
 
-    print("Total records received:", len(df))
-    return df
-
-def parse_sreality_sell_data(pages=5):
-    url = "https://www.sreality.cz/api/cs/v2/estates"
-    headers = {
-        "User-Agent": "Mozilla/5.0",
-        "Accept": "application/json"
-    }
-
-    all_data = []
-    per_page = 100  
-    for page in range(pages):
-        params = {
-            "category_main_cb": 1,      
-            "category_type_cb": 1,     
-            "per_page": per_page,
-            "locality_region_id": 10,
-            "page": page
-        }
-
-        try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()  
-            data = response.json()
-
-            estates = data['_embedded']['estates']
-
-            for estate in estates:
-                labels_all = estate.get("labelsAll", [])
-                tech_labels = labels_all[0] if len(labels_all) > 0 else []
-                infra_labels = labels_all[1] if len(labels_all) > 1 else []
-                images_links = estate.get("_links", {}).get("images", [])
-                image_urls = [img.get("href") for img in images_links if img.get("href")]
-                main_image = image_urls[0] if image_urls else "https://via.placeholder.com/400x300?text=No+Photo"
-
-               
-                if 'furnished' in tech_labels:
-                    furnishing = 'furnished'
-                elif 'partly_furnished' in tech_labels:
-                    furnishing = 'partly_furnished'
-                elif 'not_furnished' in tech_labels:
-                    furnishing = 'not_furnished'
-                else:
-                    furnishing = None
-
-                mhd_tag={'bus_public_transport', 'tram', 'metro' , 'train'}
-                mhd=any(tag in infra_labels for tag in mhd_tag)
-                garage=any('garage' in tech_labels for infa in tech_labels)
-                loggia=any('loggia' in tech_labels for infa in tech_labels)
-                balcony=any('balcony' in tech_labels for infa in tech_labels)
-                gps=estate.get("gps" , {})
-                latitude=gps.get("lat") 
-                longitude= gps.get("lon") 
-                all_data.append({
-                    "id":estate.get("hash_id"),
-                    "locality": estate.get("locality"),
-                    "price": estate.get("price"),
-                    "name": estate.get("name"),
-                    "city_raw": estate.get("seo", {}).get("locality"),
-                    "labels_all": labels_all,
-                    "furnishing": furnishing,
-                    "mhd": mhd,
-                    "garage": garage,
-                    "loggia": loggia,
-                    "balcony": balcony,
-                    "gps": gps,
-                    "latitude": latitude,
-                    "longitude": longitude,
-                    "main_image": main_image,       # Ссылка на главное фото
-                    "all_images": image_urls,
-                })
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error while fetching page {page + 1}: {e}")
-            break
-
-    df = pd.DataFrame(all_data)
-    print("✅ Total listings fetched:", len(df))
-    return df
+def parse_sreality_sell_data(pages=5, cache=None, replay=False):
+    return _run_adapter("sreality", "sale", cache, replay, pages=pages)
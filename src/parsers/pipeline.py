@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PIPELINE_DIR = Path("./data/pipeline")
+MANIFEST_FILE = "manifest.json"
+# Finished runs beyond the newest KEEP_RUNS are deleted; unfinished ones are
+# kept for --resume until they are MAX_AGE_DAYS old
+KEEP_RUNS = int(os.getenv("PIPELINE_KEEP_RUNS", "5"))
+MAX_AGE_DAYS = int(os.getenv("PIPELINE_MAX_AGE_DAYS", "30"))
+
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def latest_run_id(root=PIPELINE_DIR):
+    runs = sorted(p.parent.name for p in Path(root).glob(f"*/{MANIFEST_FILE}"))
+    return runs[-1] if runs else None
+
+
+def prune_runs(root=PIPELINE_DIR, keep=KEEP_RUNS, max_age_days=MAX_AGE_DAYS):
+    """Delete the checkpoints of old runs; returns the removed run ids."""
+    manifests = sorted(Path(root).glob(f"*/{MANIFEST_FILE}"), reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    finished = 0
+    removed = []
+    for path in manifests:
+        manifest = json.loads(path.read_text())
+        if manifest.get("finished_at"):
+            finished += 1
+            stale = finished > keep
+        else:
+            stale = path.stat().st_mtime < cutoff
+        if stale:
+            shutil.rmtree(path.parent)
+            removed.append(path.parent.name)
+    if removed:
+        print(f"🧹 Removed old pipeline runs: {', '.join(removed)}")
+    return removed
+
+
+def frame_memory_mb(df: pd.DataFrame):
+    return round(float(df.memory_usage(deep=True).sum()) / 2**20, 2)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _is_dict_column(series: pd.Series):
+    return series.dtype == object and series.map(lambda v: isinstance(v, dict)).any()
+
+
+def _from_arrow(value):
+    # Parquet hands list cells back as numpy arrays; the cleaning code expects lists
+    if isinstance(value, np.ndarray):
+        return [_from_arrow(v) for v in value]
+    return value
+
+
+def write_checkpoint(df: pd.DataFrame, path: Path):
+    """Write `df` as Parquet; dict cells (e.g. raw gps) are stored as JSON text.
+    Returns the names of the JSON-encoded columns."""
+    df = df.reset_index(drop=True)
+    json_columns = [c for c in df.columns if _is_dict_column(df[c])]
+    if json_columns:
+        df = df.copy()
+        for col in json_columns:
+            df[col] = df[col].map(lambda v: json.dumps(v) if isinstance(v, dict) else None)
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    return json_columns
+
+
+def read_checkpoint(path: Path, json_columns=()) -> pd.DataFrame:
+    df = pd.read_parquet(path)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].map(_from_arrow)
+    for col in json_columns:
+        df[col] = df[col].map(lambda v: json.loads(v) if isinstance(v, str) else {})
+    return df
+
+
+class PipelineRun:
+    """Named stages of one ingestion run, checkpointed under data/pipeline/<run_id>/.
+
+    Every stage returns a dict of DataFrames that is written as
+    `<stage>.<frame>.parquet`; manifest.json records status, wall time and
+    row counts, frame memory and peak RSS per stage. Passing an existing `run_id` resumes that run:
+    stages already marked done are loaded from their checkpoints instead of
+    being run again.
+    """
+
+    def __init__(self, run_id=None, root=PIPELINE_DIR, **params):
+        if run_id == "latest":
+            run_id = latest_run_id(root)
+            if run_id is None:
+                raise FileNotFoundError(f"No pipeline runs in {root} to resume")
+        self.resumed = run_id is not None
+        self.run_id = run_id or new_run_id()
+        self.dir = Path(root) / self.run_id
+        self.manifest_path = self.dir / MANIFEST_FILE
+
+        if self.resumed:
+            if not self.manifest_path.exists():
+                raise FileNotFoundError(f"No pipeline run {self.run_id} in {root}")
+            self.manifest = json.loads(self.manifest_path.read_text())
+            done = [name for name, s in self.manifest["stages"].items() if s["status"] == "done"]
+            print(f"🔁 Resuming run {self.run_id}, done stages: {', '.join(done) or 'none'}")
+        else:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self.manifest = {
+                "run_id": self.run_id,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "params": params,
+                "stages": {},
+            }
+            self._save_manifest()
+            print(f"🆕 Pipeline run {self.run_id}")
+
+    @property
+    def params(self):
+        return self.manifest.get("params", {})
+
+    def finish(self):
+        self.manifest["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        self._save_manifest()
+
+    def _save_manifest(self):
+        tmp = self.manifest_path.with_name(MANIFEST_FILE + ".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        tmp.replace(self.manifest_path)
+
+    def _path(self, stage, frame):
+        return self.dir / f"{stage}.{frame}.parquet"
+
+    def stage(self, name, fn, *args, **kwargs) -> dict:
+        record = self.manifest["stages"].get(name)
+        if record and record["status"] == "done":
+            print(f"⏭ Stage {name}: loaded from checkpoint")
+            return {
+                frame: read_checkpoint(self._path(name, frame), record["json_columns"].get(frame, ()))
+                for frame in record["rows"]
+            }
+
+        print(f"▶ Stage {name}...")
+        started_at = datetime.now().isoformat(timespec="seconds")
+        started = time.perf_counter()
+        try:
+            outputs = fn(*args, **kwargs)
+            json_columns = {frame: write_checkpoint(df, self._path(name, frame)) for frame, df in outputs.items()}
+        except Exception as e:
+            self.manifest["stages"][name] = {
+                "status": "failed",
+                "started_at": started_at,
+                "seconds": round(time.perf_counter() - started, 2),
+                "error": f"{type(e).__name__}: {e}",
+            }
+            self._save_manifest()
+            print(f"❌ Stage {name} failed, resume with --resume {self.run_id}")
+            raise
+
+        seconds = round(time.perf_counter() - started, 2)
+        rows = {frame: len(df) for frame, df in outputs.items()}
+        memory = {frame: frame_memory_mb(df) for frame, df in outputs.items()}
+        self.manifest["stages"][name] = {
+            "status": "done",
+            "started_at": started_at,
+            "seconds": seconds,
+            "rows": rows,
+            "memory_mb": memory,
+            "peak_rss_mb": peak_rss_mb(),
+            "json_columns": {frame: cols for frame, cols in json_columns.items() if cols},
+        }
+        self._save_manifest()
+        print(f"   ⏱ {name} took {seconds:.1f}s, rows: {rows}")
+        print(f"   🧠 frames MB: {memory}, peak RSS: {peak_rss_mb()} MB")
+        return outputs
@@ -0,0 +1,90 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+# Starting requests/second per upstream host
+HOST_RATES = {
+    "api.bezrealitky.cz": 5.0,
+    "www.sreality.cz": 8.0,
+}
+DEFAULT_RATE = 4.0
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class AdaptiveRateLimiter:
+    """Token bucket for one host whose refill rate adapts to what it observes.
+
+    Successful, fast responses raise the rate additively; errors halve it and
+    slow responses shave it down (AIMD). A Retry-After from the server pauses
+    the whole bucket, so every source sharing the host backs off together.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None, min_rate=0.5, max_rate=None,
+                 target_latency=2.0, increase=0.5):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.target_latency = target_latency
+        self.increase = increase
+        self.tokens = self.burst
+        self.latency = None
+        self.error_rate = 0.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def record(self, latency, ok):
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.error_rate = 0.8 * self.error_rate + 0.2 * (0.0 if ok else 1.0)
+        if not ok:
+            self.rate = max(self.min_rate, self.rate / 2)
+        elif self.latency > self.target_latency:
+            self.rate = max(self.min_rate, self.rate * 0.9)
+        elif self.error_rate < 0.05:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def retry_after_seconds(header):
+    if not header:
+        return None
+    try:
+        return max(0.0, float(header))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after is not None:
+        return min(BACKOFF_MAX, retry_after)
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,203 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.parsers.http_cache import CacheMiss, ResponseCache
+from src.parsers.rate_limit import (
+    DEFAULT_RATE,
+    HOST_RATES,
+    MAX_RETRIES,
+    RETRY_STATUSES,
+    AdaptiveRateLimiter,
+    backoff_delay,
+    retry_after_seconds,
+)
+
+# Max simultaneous in-flight requests per upstream host
+HOST_CONCURRENCY = {
+    "api.bezrealitky.cz": 4,
+    "www.sreality.cz": 6,
+}
+DEFAULT_HOST_CONCURRENCY = 4
+# Extra rounds for windows whose requests still failed after the engine's own retries
+WINDOW_RETRIES = 1
+# Incremental mode: stop a source after this many consecutive pages of already-known adverts
+KNOWN_PAGES_TO_STOP = 2
+# Incremental mode: pages requested at once while looking for the known-adverts boundary
+INCREMENTAL_WAVE = 4
+
+
+class ScrapingEngine:
+    def __init__(self, host_concurrency=None, timeout=30.0, cache=None, replay=False,
+                 host_rates=None, max_retries=MAX_RETRIES):
+        self.host_concurrency = {**HOST_CONCURRENCY, **(host_concurrency or {})}
+        self.host_rates = {**HOST_RATES, **(host_rates or {})}
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # replay=True serves responses from the cache only and never touches the network
+        if cache is None and replay:
+            cache = ResponseCache()
+        self.cache = cache
+        self.replay = replay
+        self._semaphores = {}
+        self._limiters = {}
+        self._client = None
+
+    async def __aenter__(self):
+        max_connections = sum(self.host_concurrency.values())
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30.0,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+        self._client = None
+        for host, limiter in self._limiters.items():
+            print(f"{host}: settled at {limiter.rate:.1f} req/s, error rate {limiter.error_rate:.0%}")
+        if self.cache is not None:
+            print(f"HTTP cache: {self.cache.hits} hits, {self.cache.misses} misses")
+            if not self.replay:
+                self.cache.evict()
+
+    def _semaphore(self, host):
+        if host not in self._semaphores:
+            limit = self.host_concurrency.get(host, DEFAULT_HOST_CONCURRENCY)
+            self._semaphores[host] = asyncio.Semaphore(limit)
+        return self._semaphores[host]
+
+    def _limiter(self, host):
+        if host not in self._limiters:
+            self._limiters[host] = AdaptiveRateLimiter(self.host_rates.get(host, DEFAULT_RATE))
+        return self._limiters[host]
+
+    async def _send(self, method, url, headers=None, params=None, json=None):
+        """Send one request through the host's rate limiter, retrying 429s,
+        5xx and transport errors with exponential backoff (or Retry-After)."""
+        host = urlsplit(url).hostname
+        limiter = self._limiter(host)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            started = time.monotonic()
+            try:
+                async with self._semaphore(host):
+                    response = await self._client.request(
+                        method, url, headers=headers, params=params, json=json
+                    )
+            except httpx.TransportError:
+                limiter.record(time.monotonic() - started, ok=False)
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            retryable = response.status_code in RETRY_STATUSES
+            limiter.record(time.monotonic() - started, ok=not retryable)
+            if not retryable or attempt == self.max_retries:
+                response.raise_for_status()
+                return response
+
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            delay = backoff_delay(attempt, retry_after)
+            if retry_after is not None:
+                limiter.pause(delay)
+            await asyncio.sleep(delay)
+
+    async def request_json(self, method, url, headers=None, params=None, json=None):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(method, url, params, json)
+            cached = self.cache.get(key, ignore_ttl=self.replay)
+            if cached is not None:
+                return cached
+            if self.replay:
+                raise CacheMiss(f"No cached response for {method} {url}")
+
+        response = await self._send(method, url, headers=headers, params=params, json=json)
+        data = response.json()
+        if key is not None:
+            self.cache.put(key, data)
+        return data
+
+    async def get_json(self, url, headers=None, params=None):
+        return await self.request_json("GET", url, headers=headers, params=params)
+
+    async def post_json(self, url, headers=None, json=None):
+        return await self.request_json("POST", url, headers=headers, json=json)
+
+
+def run_async(coro_fn, *args, engine_options=None, **kwargs):
+    async def _main():
+        async with ScrapingEngine(**(engine_options or {})) as engine:
+            return await coro_fn(engine, *args, **kwargs)
+    return asyncio.run(_main())
+
+
+async def iter_offset_windows(fetch_window, offsets, retries=WINDOW_RETRIES):
+    """Fetch every offset window in parallel and yield (offset, result) as each
+    one completes. Failed windows are retried on their own; cache misses in
+    replay mode are skipped.
+    """
+    async def attempt(offset):
+        try:
+            return offset, await fetch_window(offset)
+        except httpx.HTTPError as e:
+            return offset, e
+
+    pending = list(offsets)
+    for round_ in range(retries + 1):
+        if not pending:
+            return
+        if round_:
+            print(f"Retrying {len(pending)} failed windows (attempt {round_}/{retries})...")
+        failed = []
+        for next_done in asyncio.as_completed([attempt(o) for o in pending]):
+            offset, outcome = await next_done
+            if isinstance(outcome, CacheMiss):
+                continue
+            if isinstance(outcome, httpx.HTTPError):
+                print(f"Error at offset {offset}: {outcome}")
+                failed.append(offset)
+                continue
+            yield offset, outcome
+        pending = failed
+    if pending:
+        print(f"⚠️ Gave up on {len(pending)} windows at offsets {pending}")
+
+
+async def iter_until_known(fetch_window, offsets, ids_of, known_ids, source,
+                           stop_after=KNOWN_PAGES_TO_STOP, prefetched=None):
+    """Walk newest-first windows in small waves, yielding (offset, result) in
+    order, until `stop_after` consecutive windows contain only adverts whose
+    (source, external_id) is in `known_ids`.
+    """
+    prefetched = prefetched or {}
+    offsets = list(offsets)
+    known_streak = 0
+    for i in range(0, len(offsets), INCREMENTAL_WAVE):
+        wave = offsets[i:i + INCREMENTAL_WAVE]
+        fetched = {o: prefetched[o] for o in wave if o in prefetched}
+        async for offset, result in iter_offset_windows(fetch_window, [o for o in wave if o not in prefetched]):
+            fetched[offset] = result
+        for offset in wave:
+            if offset not in fetched:
+                known_streak = 0
+                continue
+            ids = ids_of(fetched[offset])
+            if not ids:
+                return
+            yield offset, fetched[offset]
+            if all((source, str(ext_id)) in known_ids for ext_id in ids):
+                known_streak += 1
+                if known_streak >= stop_after:
+                    print(f"{source}: reached known adverts at offset {offset}, stopping")
+                    return
+            else:
+                known_streak = 0
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 
 
 class RentListingRead(BaseModel):
@@ -56,6 +56,11 @@ class SellListingRead(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class SellListingPage(BaseModel):
+    items: List[SellListingRead]
+    # pass back as ?cursor= for the next page; None on the last one
+    next_cursor: Optional[str] = None
+
 class RentPredictionRequest(BaseModel):
     surface: int
     distance_to_center: float
@@ -66,4 +71,7 @@ class RentPredictionRequest(BaseModel):
     loggia: bool = False
     disposition: Optional[str] = None
     furnishing: Optional[str] = None
-    district: Optional[str] = None
\ No newline at end of file
+    district: Optional[str] = None
+    # used for the POI features of models trained with them
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
\ No newline at end of file
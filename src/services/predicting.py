@@ -1,38 +1,76 @@
+import json
+from sqlalchemy import update
 from src.db import get_session , SellListing
 from src.services.predictor import Predictor
 import pandas as pd
 from src.services.my_classes import Encoder
 
-session = get_session()
-predictor = Predictor()
-
-listings = session.query(SellListing).all()
-
-data = []
-for listing in listings:
-    data.append({
-        "id": listing.id,
-        "surface": listing.surface,
-        "distance_to_center": listing.distance_to_center,
-        "distance_to_metro_km": listing.distance_to_metro_km,
-        "garage": listing.garage, 
-        "mhd": listing.mhd,
-        "balcony": listing.balcony,
-        "loggia": listing.loggia,
-        "disposition": listing.disposition,
-        "furnishing": listing.furnishing,
-        "district": listing.district
-    })
-
-df = pd.DataFrame(data)
-features = ["surface", "distance_to_center", "distance_to_metro_km","garage", "mhd", "balcony", "loggia",
-         "disposition", "furnishing", "district"]
-X = df[features]
-df['predicted_rent_price'] = predictor.model.predict(X).round(2)
-for _, row in df.iterrows():
-    listing = session.query(SellListing).filter_by(id=row['id']).first()
-    listing.predicted_rent_price = float(row['predicted_rent_price'])
-session.commit()
-session.close()
-
-print("Predicted rent prices added to sell listings , number of listings updated:", len(df))
+BATCH_SIZE = 1000
+
+
+def years_to_payback(price, predicted_rent_price):
+    annual_rent = predicted_rent_price.where(predicted_rent_price > 0) * 12
+    return (price / annual_rent).round(2)
+
+
+def predict_sell_rents(external_ids=None):
+    """Write predicted_rent_price for sell listings.
+
+    `external_ids` limits the run to those listings (e.g. the changed set
+    returned by save_to_database); None re-predicts the whole table.
+    """
+    if external_ids is not None and not external_ids:
+        return 0
+    predictor = Predictor()
+    if predictor.model is None:
+        print("⚠️ No rent model, predicted rent prices not updated")
+        return 0
+
+    session = get_session()
+    try:
+        if external_ids is None:
+            listings = session.query(SellListing).all()
+        else:
+            external_ids = list(external_ids)
+            listings = []
+            for start in range(0, len(external_ids), BATCH_SIZE):
+                listings.extend(session.query(SellListing).filter(
+                    SellListing.external_id.in_(external_ids[start:start + BATCH_SIZE])
+                ).all())
+        if not listings:
+            return 0
+
+        data = []
+        for listing in listings:
+            data.append({
+                "id": listing.id,
+                "price": listing.price,
+                "surface": listing.surface,
+                "distance_to_center": listing.distance_to_center,
+                "distance_to_metro_km": listing.distance_to_metro_km,
+                "garage": listing.garage,
+                "mhd": listing.mhd,
+                "balcony": listing.balcony,
+                "loggia": listing.loggia,
+                "disposition": listing.disposition,
+                "furnishing": listing.furnishing,
+                "district": listing.district,
+                **json.loads(listing.poi_features or "{}"),
+            })
+
+        df = pd.DataFrame(data)
+        X = df.reindex(columns=predictor.features)
+        df['predicted_rent_price'] = predictor.model.predict(X).round(2)
+        df['years_to_payback'] = years_to_payback(df['price'], df['predicted_rent_price'])
+        records = df[["id", "predicted_rent_price", "years_to_payback"]]
+        session.execute(update(SellListing), records.astype(object).where(records.notna(), None).to_dict("records"))
+        session.commit()
+    finally:
+        session.close()
+
+    print("Predicted rent prices added to sell listings , number of listings updated:", len(df))
+    return len(df)
+
+
+if __name__ == "__main__":
+    predict_sell_rents()
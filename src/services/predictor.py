@@ -2,19 +2,25 @@ import pandas as pd
 import numpy as np
 import joblib
 from pathlib import Path
+from src.parsers.enrichment import add_poi_features, load_poi_layers
 from src.services.my_classes import Encoder
 
 import __main__
 __main__.Encoder = Encoder
 
 class Predictor:
-    def __init__(self):
+    def __init__(self, regressor_path=None):
         self.features = ["surface", "distance_to_center", "distance_to_metro_km","garage", "mhd", "balcony", "loggia",
                          "disposition", "furnishing", "district"]
         self.base_dir = Path(__file__).resolve().parent.parent.parent
-        self.regressor_path = self.base_dir / "models" / "rent_regressor_pipeline.joblib"
+        # tests pass a throwaway model in a tmp dir instead of touching models/
+        self.regressor_path = Path(regressor_path or self.base_dir / "models" / "rent_regressor_pipeline.joblib")
         self.model = None
+        self.poi_layers = None
         self.load_model()
+        # A model retrained with POI columns (poi_<layer>_km, ...) declares them itself
+        if getattr(self.model, "feature_names_in_", None) is not None:
+            self.features = list(self.model.feature_names_in_)
     
     def load_model(self):
         try:
@@ -26,7 +32,14 @@ class Predictor:
     
     def predict(self, data):
         df = pd.DataFrame([data])
-        df = df[self.features]
+        # POI features come from the point itself; without coordinates they stay
+        # missing and the pipeline imputes them, as for listings without GPS
+        if any(f.startswith("poi_") for f in self.features) and {"latitude", "longitude"} <= set(df.columns):
+            if self.poi_layers is None:
+                self.poi_layers = load_poi_layers()
+            df[["latitude", "longitude"]] = df[["latitude", "longitude"]].astype(float)
+            add_poi_features(df, self.poi_layers)
+        df = df.reindex(columns=self.features)
         prediction = self.model.predict(df)
         return float(prediction[0])
 
@@ -1,5 +1,7 @@
+import argparse
 import logging
 from datetime import datetime
+from src.db.data_version import bump_data_version
 from src.parsers.data_cleaning import run_cleaning
 
 logging.basicConfig(
@@ -8,16 +10,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def monthly_data_update():
+def monthly_data_update(full_crawl=False, run_id=None):
     logger.info("=" * 60)
-    logger.info(f"MONTHLY UPDATE STARTED at {datetime.now()}")
+    logger.info(f"{'FULL' if full_crawl else 'INCREMENTAL'} UPDATE STARTED at {datetime.now()}")
     logger.info("=" * 60)
     
     try:
-        rent_df, sell_df = run_cleaning()
+        rent_df, sell_df = run_cleaning(full_crawl=full_crawl, run_id=run_id)
         
         logger.info(f"✅ Rent listings processed: {len(rent_df)}")
         logger.info(f"✅ Sell listings processed: {len(sell_df)}")
+        # expire the API response caches
+        logger.info(f"✅ Data version: {bump_data_version()}")
         logger.info("✅ Monthly update completed successfully!")
         
     except Exception as e:
@@ -25,4 +29,14 @@ def monthly_data_update():
         raise
 
 if __name__ == "__main__":
-    monthly_data_update()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Scrape, clean and store Prague listings")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="crawl the whole market instead of stopping each source at already-known listings",
+    )
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", metavar="RUN_ID",
+        help="resume a failed run from its checkpoints in data/pipeline/ (default: latest run)",
+    )
+    args = parser.parse_args()
+    monthly_data_update(full_crawl=args.full, run_id=args.resume)
\ No newline at end of file
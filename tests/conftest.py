@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+import pytest
+
+# src.db builds its engines at import time, so point them at a throwaway file first
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/realty.db"
+
+from sqlalchemy import text  # noqa: E402
+
+from src.db import Base, engine, init_db  # noqa: E402
+from src.db.fulltext import FTS_TABLES  # noqa: E402
+from src.db.spatial import RTREES  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """An upgraded, empty database for one test."""
+    init_db()
+    yield engine
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+        for table in [*FTS_TABLES.values(), *RTREES.values()]:
+            conn.execute(text(f"DELETE FROM {table.name}"))
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from src.parsers.adapters import (
+    ADAPTERS,
+    BezrealitkyAdapter,
+    SourceAdapter,
+    SrealityAdapter,
+    default_adapters,
+    make_adapter,
+    register_adapter,
+)
+
+
+class FakeSource(SourceAdapter):
+    source = "fake"
+
+    def offsets(self):
+        return range(3)
+
+    async def fetch_page(self, engine, offset):
+        return [{"id": offset * 10 + i} for i in range(4)]
+
+    def item_id(self, item):
+        return item["id"]
+
+    def parse(self, item):
+        return {"id": item["id"], "listing_type": self.listing_type}
+
+
+@pytest.fixture
+def fake_source():
+    register_adapter(FakeSource)
+    yield FakeSource
+    ADAPTERS.pop("fake")
+
+
+def collect(adapter, chunk_size):
+    async def run():
+        return [chunk async for chunk in adapter.records(engine=None, chunk_size=chunk_size)]
+    return asyncio.run(run())
+
+
+def test_default_crawl_is_built_from_the_registry():
+    adapters = default_adapters(sreality_rent_pages=7, known_ids={("bezrealitky", "1")})
+    assert [(type(a), a.listing_type) for a in adapters] == [
+        (BezrealitkyAdapter, "rent"), (SrealityAdapter, "rent"),
+        (BezrealitkyAdapter, "sale"), (SrealityAdapter, "sale"),
+    ]
+    assert adapters[1].page_count == 7
+    # Sreality pages are unordered, so it never stops on known ids
+    assert adapters[0].known_ids and adapters[1].known_ids is None
+
+
+def test_registered_source_streams_records_in_chunks(fake_source):
+    chunks = collect(make_adapter("fake", "sale"), chunk_size=5)
+    assert [len(chunk) for chunk in chunks] == [5, 5, 2]
+    assert sorted(r["id"] for chunk in chunks for r in chunk) == [0, 1, 2, 3, 10, 11, 12, 13, 20, 21, 22, 23]
+    assert {r["listing_type"] for chunk in chunks for r in chunk} == {"sale"}
+
+
+def test_unknown_source_is_rejected():
+    with pytest.raises(ValueError, match="Unknown source"):
+        make_adapter("idnes", "rent")
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints.analytics import router
+from src.db import RentListing, get_session
+from src.db.aggregates import refresh_aggregates
+
+
+@pytest.fixture
+def client(db):
+    session = get_session()
+    session.add_all([
+        RentListing(external_id="b-1", canonical_id="b-1", source="bezrealitky", price=20000, disposition="2+kk", district="Praha 2"),
+        RentListing(external_id="s-1", canonical_id="b-1", source="sreality", price=19000, disposition="2+kk", district="Praha 2"),
+        RentListing(external_id="b-2", canonical_id="b-2", source="bezrealitky", price=30000, disposition="2+kk", district="Praha 3"),
+        RentListing(external_id="b-3", canonical_id="b-3", source="bezrealitky", price=16000, disposition="1+kk", district="Praha 3"),
+        # "price on request" placeholders
+        RentListing(external_id="s-2", canonical_id="s-2", source="sreality", price=1, disposition="1+kk", district="Praha 3"),
+        RentListing(external_id="s-3", canonical_id="s-3", source="sreality", price=2000, disposition="3+kk", district="Praha 3"),
+    ])
+    session.commit()
+    session.close()
+    refresh_aggregates("rent")
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_count_by_disposition_skips_duplicates_and_placeholder_prices(client):
+    # before the aggregates, 1+kk counted 2 and 3+kk showed up with its 2000 CZK listing
+    assert client.get("/api/analytics/count_by_disposition").json() == {"labels": ["2+kk", "1+kk"], "values": [2, 1]}
+
+
+def test_average_price_skips_placeholder_prices(client):
+    body = client.get("/api/analytics/average_price").json()
+    # the 1 CZK placeholder no longer drags the 1+kk average down to 8000.5
+    assert dict(zip(body["labels"], body["values"])) == {"1+kk": 16000.0, "2+kk": 25000.0}
@@ -0,0 +1,40 @@
+import math
+
+import pandas as pd
+
+from src.parsers.data_cleaning import DEDUP_MAX_DISTANCE_KM, EARTH_RADIUS_KM, mark_duplicates
+
+# degrees of latitude for a north-south distance in km
+KM_TO_LAT = 180 / (math.pi * EARTH_RADIUS_KM)
+
+
+def _listings(rows):
+    return pd.DataFrame(rows, columns=["id", "source", "price", "surface", "disposition", "latitude", "longitude"])
+
+
+def test_copies_within_the_distance_threshold_are_merged():
+    # one pair ~14 m apart, one just inside DEDUP_MAX_DISTANCE_KM
+    df = _listings([
+        ("b-1", "bezrealitky", 7_500_000, 61, "2+kk", 50.0800, 14.4501),
+        ("s-1", "sreality", 7_450_000, 60, "2+kk", 50.0800 + 0.014 * KM_TO_LAT, 14.4501),
+        ("b-2", "bezrealitky", 5_000_000, 45, "1+kk", 50.1000, 14.4000),
+        ("s-2", "sreality", 5_000_000, 45, "1+kk", 50.1000 + 0.9 * DEDUP_MAX_DISTANCE_KM * KM_TO_LAT, 14.4000),
+    ])
+
+    mark_duplicates(df)
+
+    assert df["canonical_id"].tolist() == ["b-1", "b-1", "b-2", "b-2"]
+
+
+def test_far_apart_or_different_listings_stay_separate():
+    df = _listings([
+        ("b-1", "bezrealitky", 7_500_000, 61, "2+kk", 50.0800, 14.4500),
+        ("s-1", "sreality", 7_500_000, 61, "2+kk",
+         50.0800 + 1.1 * DEDUP_MAX_DISTANCE_KM * KM_TO_LAT, 14.4500),  # just past the threshold
+        ("s-2", "sreality", 7_500_000, 61, "3+kk", 50.0800, 14.4500),   # other disposition
+        ("s-3", "sreality", 9_000_000, 61, "2+kk", 50.0801, 14.4500),   # price off by 20 %
+    ])
+
+    mark_duplicates(df)
+
+    assert df["canonical_id"].tolist() == ["b-1", "s-1", "s-2", "s-3"]
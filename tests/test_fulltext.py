@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from src.api.endpoints.marketplace import router
+from src.db import SellListing, get_session
+from src.db.fulltext import keyword_match, phrase_prefix
+from src.parsers.data_cleaning import save_to_database
+
+COLUMNS = ["id", "source", "price", "surface", "disposition", "district", "nearest_metro", "balcony", "garage"]
+LISTINGS = [
+    ("b-1", "bezrealitky", 6_000_000, 50, "2+kk", "Praha 2", "Náměstí Míru", True, False),
+    ("b-2", "bezrealitky", 7_000_000, 70, "3+1", "Praha 3", "Jiřího z Poděbrad", False, True),
+    ("s-1", "sreality", 5_000_000, 40, "1+kk", "Praha 21", "Anděl", False, False),
+]
+
+
+def test_user_input_only_reaches_match_as_quoted_words():
+    assert phrase_prefix("2+kk") == '"2 kk"*'
+    assert phrase_prefix('") OR *') == '"OR"*'  # an operator becomes a plain word
+    assert phrase_prefix("+*") is None
+    assert keyword_match("praha 2+kk") == '"praha"* AND "2 kk"*'
+    assert keyword_match("   ") is None
+
+
+def save(rows):
+    listings = pd.DataFrame(rows, columns=COLUMNS)
+    save_to_database(listings.assign(canonical_id=listings["id"]), "sale")
+
+
+@pytest.fixture
+def client(db):
+    save(LISTINGS)
+    # the marketplace only lists flats with a predicted rent
+    session = get_session()
+    session.execute(update(SellListing).values(predicted_rent_price=20000))
+    session.commit()
+    session.close()
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def search(client, q):
+    items = client.get("/api/marketplace/", params={"q": q}).json()["items"]
+    return sorted(item["district"] for item in items)
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("balkon", ["Praha 2"]),
+    ("garage", ["Praha 3"]),
+    ("namesti miru", ["Praha 2"]),       # diacritics folded
+    ("2+kk", ["Praha 2"]),               # not the "2" of Praha 2 followed by 1+kk
+    ("praha 2", ["Praha 2", "Praha 21"]),     # prefix of the last word: Praha 2, Praha 21
+    ("and", ["Praha 21"]),
+])
+def test_keyword_search(client, q, expected):
+    assert search(client, q) == expected
+
+
+def test_index_follows_updates(client):
+    moved = [("s-1", "sreality", 5_000_000, 40, "1+kk", "Praha 7", "Vltavská", True, False)]
+    save(moved)
+
+    assert search(client, "balkon") == ["Praha 2", "Praha 7"]
+    assert search(client, "andel") == []
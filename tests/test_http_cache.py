@@ -0,0 +1,63 @@
+import functools
+import os
+import time
+
+import httpx
+import pytest
+
+from src.parsers import scraper
+from src.parsers.http_cache import CacheMiss, ResponseCache
+from src.parsers.scraper import iter_offset_windows, run_async
+
+URL = "https://api.bezrealitky.cz/graphql/"
+
+
+def graphql(offset):
+    return {"query": "AdvertList", "variables": {"offset": offset, "limit": 50}}
+
+
+def test_key_depends_on_graphql_variables():
+    assert ResponseCache.key("POST", URL, json_body=graphql(0)) != ResponseCache.key("POST", URL, json_body=graphql(50))
+    assert ResponseCache.key("post", URL, json_body=graphql(0)) == ResponseCache.key("POST", URL, json_body=graphql(0))
+
+
+def test_entries_expire_and_are_evicted_oldest_first(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=3600, max_bytes=70)
+    keys = [ResponseCache.key("GET", URL, {"page": page}) for page in range(3)]
+    for age, key in zip([7200, 20, 10], keys):
+        cache.put(key, {"estates": "x" * 20})
+        then = time.time() - age
+        os.utime(cache._path(key), (then, then))
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[0], ignore_ttl=True) == {"estates": "x" * 20}
+
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is not None and cache.get(keys[2]) is not None
+
+    cache.max_bytes = 50
+    assert cache.evict() == 1
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is not None
+
+
+def test_replay_serves_cached_responses_without_the_network(tmp_path, monkeypatch):
+    def offline(request):
+        pytest.fail(f"replay hit the network: {request.url}")
+
+    client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(offline))
+    monkeypatch.setattr(scraper.httpx, "AsyncClient", client)
+    cache = ResponseCache(tmp_path)
+    cache.put(cache.key("POST", URL, json_body=graphql(0)), {"page": 0})
+
+    async def crawl(engine):
+        fetch = lambda offset: engine.post_json(URL, json=graphql(offset))
+        return [page async for _, page in iter_offset_windows(fetch, [0, 50])]
+
+    # offset 50 was never cached: replay skips it instead of failing the run
+    assert run_async(crawl, engine_options={"cache": cache, "replay": True}) == [{"page": 0}]
+
+    async def fetch_missing(engine):
+        return await engine.post_json(URL, json=graphql(50))
+
+    with pytest.raises(CacheMiss):
+        run_async(fetch_missing, engine_options={"cache": cache, "replay": True})
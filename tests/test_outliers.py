@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from src.parsers.outliers import split_outliers
+
+
+def _frame(price, surface, disposition):
+    # price and surface as compact_frame leaves them: nullable Int32
+    return pd.DataFrame({
+        "price": pd.array(price, dtype="Int32"),
+        "surface": pd.array(surface, dtype="Int32"),
+        "price_per_m2": [p / s if p and s else np.nan for p, s in zip(price, surface)],
+        "disposition": pd.Categorical(disposition),
+    })
+
+
+def test_missing_price_in_small_group_is_kept():
+    price = [5_000_000, None, 6_000_000] + [4_000_000 + i * 10_000 for i in range(12)]
+    surface = [50, 60, 55] + [55] * 12
+    df = _frame(price, surface, ["1+1"] * 3 + ["2+kk"] * 12)
+
+    kept, quarantined = split_outliers(df, "sale")
+
+    assert len(kept) == 15
+    assert quarantined.empty
+
+
+def test_missing_surface_does_not_hide_other_outliers():
+    price = [20_000, 21_000, 1_000] + [18_000 + i * 100 for i in range(12)]
+    surface = [50, None, 40] + [45 + i for i in range(12)]
+    df = _frame(price, surface, ["3+1"] * 3 + ["2+kk"] * 12)
+
+    kept, quarantined = split_outliers(df, "rent")
+
+    assert len(kept) == 14
+    assert quarantined["reason"].tolist() == ["price_min"]
@@ -0,0 +1,65 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.api.endpoints.marketplace import router
+from src.api.pagination import decode_cursor, encode_cursor
+from src.db import SellListing, get_session
+
+
+@pytest.fixture
+def client(db):
+    session = get_session()
+    session.add_all([
+        SellListing(external_id=f"s-{i}", canonical_id=f"s-{i}", source="sreality", price=price,
+                    predicted_rent_price=20000, years_to_payback=round(price / 240000, 2))
+        for i, price in enumerate([5_000_000, 4_000_000, 5_000_000, 6_000_000, 4_000_000])
+    ])
+    session.commit()
+    session.close()
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("payback", [20.0, 4_800_000, 7]), "payback") == [20.0, 4_800_000, 7]
+
+
+@pytest.mark.parametrize("sort, after", [
+    ("price", [1]),                       # too short for (price, id)
+    ("payback", [20.0, 3]),               # too short for (years, price, id)
+    ("price", [{"a": 1}, 2]),             # not a scalar
+    ("price", "5000000"),                 # not a list
+])
+def test_malformed_cursor_is_rejected(sort, after):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(sort, after), sort)
+    assert error.value.status_code == 400
+
+
+def test_cursor_of_another_sort_is_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor("price", [5_000_000, 1]), "payback")
+
+
+@pytest.mark.parametrize("sort", ["price", "payback"])
+def test_pages_follow_the_sort_key_without_gaps(client, sort):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2, "sort": sort, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/marketplace/", params=params).json()
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    everything = client.get("/api/marketplace/", params={"limit": 100, "sort": sort}).json()["items"]
+    assert ids == [item["id"] for item in everything]
+    assert [item["price"] for item in everything] == [4_000_000, 4_000_000, 5_000_000, 5_000_000, 6_000_000]
+
+
+def test_tampered_cursor_is_a_400_not_a_500(client):
+    cursor = encode_cursor("price", [{"a": 1}, 2])
+    assert client.get("/api/marketplace/", params={"cursor": cursor}).status_code == 400
+    assert client.get("/api/marketplace/", params={"cursor": "not base64!"}).status_code == 400
@@ -0,0 +1,42 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from src.parsers import pipeline
+from src.parsers.pipeline import MANIFEST_FILE, PipelineRun, prune_runs
+
+
+def new_run(monkeypatch, root, run_id, **params):
+    monkeypatch.setattr(pipeline, "new_run_id", lambda: run_id)
+    return PipelineRun(root=root, **params)
+
+
+def test_resumed_run_skips_done_stages_and_keeps_params(tmp_path, monkeypatch):
+    run = new_run(monkeypatch, tmp_path, "r1", full_crawl=True, replay=True, cache_dir="cache")
+    run.stage("scrape", lambda: {"rent": pd.DataFrame({"price": [20000, 25000], "gps": [{"lat": 50.1}, None]})})
+    with pytest.raises(RuntimeError):
+        run.stage("clean", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+
+    resumed = PipelineRun("latest", root=tmp_path)
+    assert resumed.run_id == "r1"
+    assert resumed.params == {"full_crawl": True, "replay": True, "cache_dir": "cache"}
+    raw = resumed.stage("scrape", lambda: pytest.fail("done stage ran again"))
+    assert raw["rent"]["price"].tolist() == [20000, 25000]
+    assert raw["rent"]["gps"].tolist() == [{"lat": 50.1}, {}]
+    assert resumed.manifest["stages"]["clean"]["status"] == "failed"
+
+
+def test_prune_keeps_newest_finished_and_recent_unfinished_runs(tmp_path, monkeypatch):
+    for run_id in ["20260101-000000", "20260102-000000", "20260103-000000"]:
+        new_run(monkeypatch, tmp_path, run_id).finish()
+    new_run(monkeypatch, tmp_path, "20260104-000000")
+    new_run(monkeypatch, tmp_path, "20260105-000000")
+    old = time.time() - 40 * 86400
+    os.utime(tmp_path / "20260104-000000" / MANIFEST_FILE, (old, old))
+
+    removed = prune_runs(tmp_path, keep=2, max_age_days=30)
+
+    assert sorted(removed) == ["20260101-000000", "20260104-000000"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["20260102-000000", "20260103-000000", "20260105-000000"]
@@ -0,0 +1,36 @@
+import joblib
+import pandas as pd
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import make_pipeline
+
+import src.services.predictor as predictor_module
+from src.parsers.enrichment import PoiLayer
+from src.services.predictor import Predictor
+
+
+def _poi_model(path):
+    # stands in for a pipeline retrained with POI columns
+    X = pd.DataFrame({"surface": [30, 50, 70, 90], "poi_tram_km": [0.1, 0.4, None, 0.9]})
+    model = make_pipeline(SimpleImputer(), LinearRegression()).fit(X, [15000, 22000, 29000, 35000])
+    joblib.dump(model, path)
+    return path
+
+
+def test_predict_without_poi_fields(tmp_path):
+    predictor = Predictor(regressor_path=_poi_model(tmp_path / "model.joblib"))
+
+    rent = predictor.predict({"surface": 50, "distance_to_center": 2.0, "distance_to_metro_km": 0.5})
+
+    assert rent > 0
+
+
+def test_predict_computes_poi_features_from_coordinates(tmp_path, monkeypatch):
+    layer = PoiLayer("tram", [50.0800], [14.4500])
+    monkeypatch.setattr(predictor_module, "load_poi_layers", lambda: [layer])
+    predictor = Predictor(regressor_path=_poi_model(tmp_path / "model.joblib"))
+
+    near = predictor.predict({"surface": 50, "latitude": 50.0801, "longitude": 14.4500})
+    far = predictor.predict({"surface": 50, "latitude": 50.0900, "longitude": 14.4500})
+
+    assert near != far
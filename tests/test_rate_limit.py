@@ -0,0 +1,86 @@
+import asyncio
+import functools
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from src.parsers import scraper
+from src.parsers.rate_limit import AdaptiveRateLimiter, retry_after_seconds
+from src.parsers.scraper import run_async
+
+URL = "https://www.sreality.cz/api/cs/v2/estates"
+
+
+def test_rate_is_additive_up_and_multiplicative_down():
+    limiter = AdaptiveRateLimiter(rate=4.0, max_rate=5.0)
+    for _ in range(5):
+        limiter.record(0.1, ok=True)
+    assert limiter.rate == 5.0
+
+    limiter.record(0.1, ok=False)
+    assert limiter.rate == 2.5
+
+    slow = AdaptiveRateLimiter(rate=4.0, target_latency=1.0)
+    slow.record(3.0, ok=True)
+    assert slow.rate == pytest.approx(3.6)
+
+
+def test_pause_holds_back_every_caller():
+    limiter = AdaptiveRateLimiter(rate=1000.0)
+    limiter.pause(0.05)
+
+    async def acquire():
+        started = asyncio.get_running_loop().time()
+        await limiter.acquire()
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(acquire()) >= 0.04
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("3") == 3.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    in_ten = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert 8 <= retry_after_seconds(in_ten) <= 10
+
+
+def serve(monkeypatch, responses):
+    """Answer requests with `responses` in order; returns the list of served requests."""
+    served = []
+
+    def handler(request):
+        served.append(request)
+        return responses[min(len(served), len(responses)) - 1]
+
+    client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(scraper.httpx, "AsyncClient", client)
+    return served
+
+
+def test_429_is_retried_after_retry_after(monkeypatch):
+    served = serve(monkeypatch, [httpx.Response(429, headers={"Retry-After": "0"}),
+                                 httpx.Response(200, json={"estates": []})])
+
+    async def fetch(engine):
+        return await engine.get_json(URL), engine._limiter("www.sreality.cz").rate
+
+    data, rate = run_async(fetch, engine_options={"host_rates": {"www.sreality.cz": 8.0}})
+
+    assert data == {"estates": []}
+    assert len(served) == 2
+    assert rate < 8.0
+
+
+def test_retries_are_bounded(monkeypatch):
+    served = serve(monkeypatch, [httpx.Response(503)])
+    monkeypatch.setattr(scraper, "backoff_delay", lambda attempt, retry_after=None: 0)
+
+    async def fetch(engine):
+        return await engine.get_json(URL)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run_async(fetch, engine_options={"max_retries": 2})
+    assert len(served) == 3
@@ -0,0 +1,17 @@
+from starlette.requests import Request
+
+from src.api.cache import etag_matches
+
+ETAG = '"3-0123abcd"'
+
+
+def _request(if_none_match):
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]})
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    assert etag_matches(_request(ETAG), ETAG)
+    assert etag_matches(_request(f'"other",{ETAG}'), ETAG)
+    assert etag_matches(_request(f'"other" , W/{ETAG}'), ETAG)
+    assert etag_matches(_request("*"), ETAG)
+    assert not etag_matches(_request('"3-ffff", W/"2-0123abcd"'), ETAG)
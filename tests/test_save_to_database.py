@@ -0,0 +1,104 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+from src.db import ListingPriceHistory, RentListing, get_session
+from src.parsers import data_cleaning
+from src.parsers.data_cleaning import save_to_database
+
+
+def _cleaned(rows):
+    return pd.DataFrame(rows, columns=["id", "source", "price", "surface", "disposition", "district", "balcony"])
+
+
+LISTINGS = [
+    ("b-1", "bezrealitky", 20000, 50, "2+kk", "Praha 2", True),
+    ("b-2", "bezrealitky", 25000, 65, "3+kk", "Praha 3", False),
+    ("s-1", "sreality", 18000, 40, "1+1", "Praha 5", False),
+]
+
+
+def _stored():
+    session = get_session()
+    try:
+        rows = session.execute(select(RentListing.id, RentListing.external_id, RentListing.price)
+                               .order_by(RentListing.external_id)).all()
+        return {external_id: (id_, price) for id_, external_id, price in rows}
+    finally:
+        session.close()
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    # batches of two, so three listings span a batch boundary
+    monkeypatch.setattr(data_cleaning, "UPSERT_BATCH_SIZE", 2)
+
+
+def test_first_save_inserts_every_row(db):
+    stats = save_to_database(_cleaned(LISTINGS + [(None, "sreality", 1, 1, None, None, False)]), "rent")
+
+    assert (stats["inserted"], stats["updated"], stats["skipped"]) == (3, 0, 1)
+    assert {k: price for k, (_, price) in _stored().items()} == {"b-1": 20000, "b-2": 25000, "s-1": 18000}
+
+
+def test_resave_updates_in_place(db):
+    save_to_database(_cleaned(LISTINGS), "rent")
+    before = _stored()
+
+    changed = [("b-2", "bezrealitky", 24000, 65, "3+kk", "Praha 3", False)]
+    stats = save_to_database(_cleaned(LISTINGS[:1] + changed + LISTINGS[2:]), "rent")
+
+    after = _stored()
+    assert (stats["inserted"], stats["updated"], stats["unchanged"]) == (0, 1, 2)
+    assert stats["changed_ids"] == ["b-2"]
+    assert after["b-2"] == (before["b-2"][0], 24000)
+    assert {k: v[0] for k, v in after.items()} == {k: v[0] for k, v in before.items()}
+
+
+def _history():
+    session = get_session()
+    try:
+        return session.execute(
+            select(ListingPriceHistory.external_id, ListingPriceHistory.scrape_date, ListingPriceHistory.price)
+            .order_by(ListingPriceHistory.external_id, ListingPriceHistory.scrape_date)
+        ).all()
+    finally:
+        session.close()
+
+
+def _scraped_on(monkeypatch, day):
+    class ScrapeDate(date):
+        @classmethod
+        def today(cls):
+            return day
+
+    monkeypatch.setattr(data_cleaning, "date", ScrapeDate)
+
+
+def test_only_changed_content_is_rewritten(db):
+    save_to_database(_cleaned(LISTINGS), "rent")
+
+    assert save_to_database(_cleaned(LISTINGS), "rent")["unchanged"] == 3
+
+    furnished = [("b-1", "bezrealitky", 20000, 50, "2+kk", "Praha 2", False)]
+    stats = save_to_database(_cleaned(furnished + LISTINGS[1:]), "rent")
+    assert (stats["updated"], stats["unchanged"], stats["changed_ids"]) == (1, 2, ["b-1"])
+
+
+def test_price_changes_are_appended_to_history(db, monkeypatch):
+    _scraped_on(monkeypatch, date(2026, 9, 1))
+    save_to_database(_cleaned(LISTINGS), "rent")
+
+    _scraped_on(monkeypatch, date(2026, 10, 1))
+    cut = [("b-1", "bezrealitky", 19000, 50, "2+kk", "Praha 2", True)]
+    edited = [("b-2", "bezrealitky", 25000, 66, "3+kk", "Praha 3", False)]  # same price
+    save_to_database(_cleaned(cut + edited + LISTINGS[2:]), "rent")
+
+    assert _history() == [
+        ("b-1", date(2026, 9, 1), 20000),
+        ("b-1", date(2026, 10, 1), 19000),
+        ("b-2", date(2026, 9, 1), 25000),
+        ("s-1", date(2026, 9, 1), 18000),
+    ]
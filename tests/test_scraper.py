@@ -0,0 +1,123 @@
+import asyncio
+import functools
+from collections import Counter
+
+import httpx
+import pytest
+
+from src.parsers import scraper
+from src.parsers.adapters import BezrealitkyAdapter
+from src.parsers.scraper import run_async
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Route the engine's httpx client to `handler` instead of the network."""
+    def install(handler):
+        client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(scraper.httpx, "AsyncClient", client)
+    return install
+
+
+def test_engine_fetches_hosts_concurrently_within_their_limits(serve):
+    in_flight, peak = Counter(), Counter()
+
+    async def handler(request):
+        host = request.url.host
+        in_flight[host] += 1
+        peak[host] = max(peak[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, json={"host": host, "page": int(request.url.params["page"])})
+
+    serve(handler)
+    hosts = {"a.test": 2, "b.test": 3}
+
+    async def crawl(engine):
+        return await asyncio.gather(*(
+            engine.get_json(f"https://{host}/estates", params={"page": page})
+            for host in hosts for page in range(8)
+        ))
+
+    pages = run_async(crawl, engine_options={"host_concurrency": hosts,
+                                             "host_rates": {host: 1000.0 for host in hosts}})
+
+    assert pages == [{"host": host, "page": page} for host in hosts for page in range(8)]
+    assert peak == hosts
+
+
+class FakeBezrealitky:
+    """Stands in for the engine: answers the GraphQL query for `total` adverts."""
+
+    def __init__(self, total, fail_once=()):
+        self.total = total
+        self.fail_once = set(fail_once)
+        self.offsets = []
+
+    async def post_json(self, url, headers=None, json=None):
+        variables = json["variables"]
+        offset, limit = variables["offset"], variables["limit"]
+        self.offsets.append(offset)
+        if offset in self.fail_once:
+            self.fail_once.discard(offset)
+            raise httpx.ConnectError("connection reset")
+        ids = range(offset, min(offset + limit, self.total))
+        return {"data": {"listAdverts": {"list": [{"id": str(i)} for i in ids], "totalCount": self.total}}}
+
+
+def test_bezrealitky_fans_out_every_window_from_total_count():
+    engine = FakeBezrealitky(total=120)
+    adapter = BezrealitkyAdapter("rent", page_size=50)
+
+    async def crawl():
+        return [chunk async for chunk in adapter.records(engine)]
+
+    records = [r for chunk in asyncio.run(crawl()) for r in chunk]
+
+    assert sorted(engine.offsets) == [0, 50, 100]
+    assert sorted(int(r["id"]) for r in records) == list(range(120))
+
+
+def test_failed_window_is_retried_on_its_own():
+    engine = FakeBezrealitky(total=150, fail_once={50})
+    adapter = BezrealitkyAdapter("sale", page_size=50)
+
+    async def crawl():
+        return [page async for page in adapter.pages(engine)]
+
+    pages = asyncio.run(crawl())
+
+    assert len(pages) == 3
+    assert sorted(engine.offsets) == [0, 50, 50, 100]
+
+
+def known(ids):
+    return {("bezrealitky", str(i)) for i in ids}
+
+
+def crawl_pages(adapter, engine):
+    async def crawl():
+        return [page async for page in adapter.pages(engine)]
+    return asyncio.run(crawl())
+
+
+def test_incremental_crawl_stops_after_pages_of_known_adverts():
+    engine = FakeBezrealitky(total=500)
+    # newest first: the first two pages are new, everything from offset 100 on is known
+    adapter = BezrealitkyAdapter("rent", page_size=50, known_ids=known(range(100, 500)), stop_after=2)
+
+    pages = crawl_pages(adapter, engine)
+
+    assert [page["list"][0]["id"] for page in pages] == ["0", "50", "100", "150"]
+    assert max(engine.offsets) < 200
+
+
+def test_a_new_advert_resets_the_known_streak():
+    engine = FakeBezrealitky(total=500)
+    # offsets 0 and 50 are new, then 150 carries one new advert between known pages
+    new = {10, 60, 160}
+    adapter = BezrealitkyAdapter("rent", page_size=50, known_ids=known(set(range(500)) - new), stop_after=2)
+
+    pages = crawl_pages(adapter, engine)
+
+    assert [page["list"][0]["id"] for page in pages] == ["0", "50", "100", "150", "200", "250"]